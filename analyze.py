@@ -0,0 +1,121 @@
+import argparse
+import io
+import json
+import math
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import chess
+import chess.pgn
+
+import parallel
+
+
+def format_score(score):
+    if math.isinf(score):
+        return "#+" if score > 0 else "#-"
+    return f"{score:+.2f}"
+
+
+def analyze_game(number, pgn_text):
+    # Annotates every move with the engine's view of the position it was played from
+    game = chess.pgn.read_game(io.StringIO(pgn_text))
+    board = parallel.worker_board
+    board.set_position(game.board().fen())
+    records = []
+
+    for node in game.mainline():
+        if board.is_game_over():
+            break
+        fen = board.board.fen()
+        ai = parallel.worker_ais[board.get_turn()]
+        best_move = ai.make_best_move()
+        score = ai.stats.score
+        if score is None:
+            # Bitbase positions are answered without a search
+            score = ai.evaluate_board()
+        if ai.color == chess.BLACK:
+            score = -score
+
+        best_san = board.board.san(best_move)
+        node.comment = f"{format_score(score)} best {best_san}"
+        records.append({
+            'game': number,
+            'ply': board.get_ply(),
+            'fen': fen,
+            'move': node.move.uci(),
+            'best': best_move.uci(),
+            'score': format_score(score),
+            'depth': ai.stats.depth,
+            'nodes': ai.stats.nodes,
+        })
+        board.push_move(node.move)
+
+    return number, str(game), records
+
+
+def read_games(pgn_file):
+    while True:
+        game = chess.pgn.read_game(pgn_file)
+        if game is None:
+            return
+        yield str(game)
+
+
+def run_analysis(input_path, output, json_path, workers, depth, movetime, hash_size_mb, max_in_flight):
+    games = 0
+    positions = 0
+    start = time.perf_counter()
+    json_file = open(json_path, "w") if json_path else None
+
+    def write(result):
+        nonlocal games, positions
+        number, pgn, records = result
+        pgn_file.write(pgn + "\n\n")
+        pgn_file.flush()
+        if json_file:
+            for record in records:
+                json_file.write(json.dumps(record) + "\n")
+            json_file.flush()
+        games += 1
+        positions += len(records)
+        print(f"game {number}: {len(records)} positions ({positions / (time.perf_counter() - start):.1f}/sec)")
+
+    # Only max_in_flight games are parsed or pending at once, and results are
+    # written in input order as soon as they're ready, so memory stays flat
+    ai_options = {'max_depth': depth, 'time_limit_ms': movetime, 'book_path': None}
+    with ProcessPoolExecutor(max_workers=workers, initializer=parallel.init_worker,
+                             initargs=(hash_size_mb, None, ai_options)) as executor, \
+            open(input_path) as input_file, open(output, "w") as pgn_file:
+        pending = deque()
+        for number, pgn_text in enumerate(read_games(input_file)):
+            if len(pending) >= max_in_flight:
+                write(pending.popleft().result())
+            pending.append(executor.submit(analyze_game, number, pgn_text))
+        while pending:
+            write(pending.popleft().result())
+
+    if json_file:
+        json_file.close()
+    return games, positions, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Annotate every position of a PGN file with the AI's evaluation")
+    parser.add_argument("pgn")
+    parser.add_argument("-o", "--output", default="analysis.pgn")
+    parser.add_argument("--json", help="also write one JSON line per position to this file")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--movetime", type=int, default=None, help="per-position budget in milliseconds")
+    parser.add_argument("--hash", type=int, default=16, help="transposition table size per worker in MB")
+    parser.add_argument("--max-in-flight", type=int, default=None, help="games queued at once, twice the workers by default")
+    args = parser.parse_args()
+
+    workers = args.workers or os.cpu_count()
+    max_in_flight = args.max_in_flight or 2 * workers
+    games, positions, seconds = run_analysis(
+        args.pgn, args.output, args.json, workers, args.depth, args.movetime, args.hash, max_in_flight)
+    print(f"{games} games, {positions} positions in {seconds:.1f}s")
@@ -0,0 +1,101 @@
+import argparse
+import io
+import os
+import struct
+
+import chess
+import chess.pgn
+
+ARCHIVE_PATH = "games.pgn"
+
+# One index record per game: PGN byte offset, PGN byte length,
+# first checkpoint record, ply count
+INDEX_STRUCT = struct.Struct("<QIQI")
+
+# A checkpoint every CHECKPOINT_INTERVAL plies: the FEN before that ply and the
+# UCI moves up to the next checkpoint, padded to a fixed width
+CHECKPOINT_INTERVAL = 16
+CHECKPOINT_BYTES = 256
+
+
+class GameArchive:
+    def __init__(self, path=ARCHIVE_PATH):
+        # Games are appended as plain PGN; the index and checkpoint files sit
+        # next to it and make any game or ply one seek away
+        self.path = path
+        self.index_path = path + ".idx"
+        self.checkpoint_path = path + ".ckp"
+
+    def __len__(self):
+        if not os.path.exists(self.index_path):
+            return 0
+        return os.path.getsize(self.index_path) // INDEX_STRUCT.size
+
+    def append(self, game):
+        text = (str(game) + "\n\n").encode()
+        board = game.board()
+        moves = list(game.mainline_moves())
+
+        checkpoints = []
+        for start in range(0, len(moves) + 1, CHECKPOINT_INTERVAL):
+            chunk = moves[start:start + CHECKPOINT_INTERVAL]
+            record = " ".join([board.fen()] + [move.uci() for move in chunk]).encode()
+            checkpoints.append(record.ljust(CHECKPOINT_BYTES - 1) + b"\n")
+            for move in chunk:
+                board.push(move)
+
+        with open(self.path, "ab") as pgn_file:
+            offset = pgn_file.tell()
+            pgn_file.write(text)
+        with open(self.checkpoint_path, "ab") as checkpoint_file:
+            first_checkpoint = checkpoint_file.tell() // CHECKPOINT_BYTES
+            checkpoint_file.write(b"".join(checkpoints))
+        # The index is written last, so a game only shows up once it is complete
+        with open(self.index_path, "ab") as index_file:
+            index_file.write(INDEX_STRUCT.pack(offset, len(text), first_checkpoint, len(moves)))
+        return len(self) - 1
+
+    def entry(self, number):
+        if not 0 <= number < len(self):
+            raise IndexError(f"no game {number} in {self.path}")
+        with open(self.index_path, "rb") as index_file:
+            index_file.seek(number * INDEX_STRUCT.size)
+            return INDEX_STRUCT.unpack(index_file.read(INDEX_STRUCT.size))
+
+    def load_game(self, number):
+        offset, length, _, _ = self.entry(number)
+        with open(self.path, "rb") as pgn_file:
+            pgn_file.seek(offset)
+            text = pgn_file.read(length).decode()
+        return chess.pgn.read_game(io.StringIO(text))
+
+    def position_at(self, number, ply):
+        # Replays at most CHECKPOINT_INTERVAL - 1 moves from the nearest checkpoint
+        _, _, first_checkpoint, plies = self.entry(number)
+        ply = max(0, min(ply, plies))
+        with open(self.checkpoint_path, "rb") as checkpoint_file:
+            checkpoint_file.seek((first_checkpoint + ply // CHECKPOINT_INTERVAL) * CHECKPOINT_BYTES)
+            fields = checkpoint_file.read(CHECKPOINT_BYTES).decode().split()
+
+        board = chess.Board(" ".join(fields[:6]))
+        for move in fields[6:6 + ply % CHECKPOINT_INTERVAL]:
+            board.push(chess.Move.from_uci(move))
+        return board
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Look up games and positions in an indexed PGN archive")
+    parser.add_argument("--archive", default=ARCHIVE_PATH)
+    parser.add_argument("--game", type=int, help="game number, starting from 0")
+    parser.add_argument("--ply", type=int, help="print the position after this many plies")
+    args = parser.parse_args()
+
+    archive = GameArchive(args.archive)
+    if args.game is None:
+        print(f"{len(archive)} games in {args.archive}")
+    elif args.ply is None:
+        print(archive.load_game(args.game))
+    else:
+        board = archive.position_at(args.game, args.ply)
+        print(board.fen())
+        print(board)
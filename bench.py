@@ -0,0 +1,329 @@
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+import chess
+
+from board import ChessBoard
+from engine import AI
+
+# name, FEN, default depth, known node counts per depth
+PERFT_POSITIONS = [
+    ("startpos", chess.STARTING_FEN, 3, [20, 400, 8902, 197281]),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1", 2, [48, 2039, 97862]),
+    ("endgame", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1", 3, [14, 191, 2812, 43238]),
+    ("promotions", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1", 3, [6, 264, 9467]),
+    ("castling", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8", 2, [44, 1486, 62379]),
+]
+
+SEARCH_POSITIONS = [
+    ("opening", "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3"),
+    ("middlegame", "r2q1rk1/pp2bppp/2n1pn2/3p4/2PP4/2N1PN2/PP2BPPP/R2QK2R w KQ - 0 9"),
+    ("tactical", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"),
+    ("endgame", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1"),
+]
+
+# Selective search toggles on AI; each configuration switches on only the listed ones
+PRUNING_OPTIONS = ('pvs', 'aspiration', 'null_move', 'lmr')
+PRUNING_CONFIGS = [('off', ())] + [(name, (name,)) for name in PRUNING_OPTIONS] + [('all', PRUNING_OPTIONS)]
+
+# Modules timed in a fresh interpreter, and the heavy imports a headless one should skip
+STARTUP_MODULES = ('engine', 'uci', 'game')
+HEAVY_MODULES = ('tkinter', 'PIL', 'concurrent.futures.process')
+STARTUP_RUNS = 5
+
+# The GUI path, timed from importing main to a built ChessApp window. It
+# prints nothing when there is no display to open the window on
+GUI_STARTUP_SCRIPT = """
+import time
+start = time.perf_counter()
+import main
+import_ms = (time.perf_counter() - start) * 1000
+try:
+    root = main.tk.Tk()
+except main.tk.TclError:
+    raise SystemExit
+app = main.ChessApp(root)
+root.update_idletasks()
+print(import_ms)
+print((time.perf_counter() - start) * 1000)
+app.game.close()
+"""
+
+DRAW_GAME = "e2e4 e7e5 g1f3 b8c6 f1c4 g8f6 e1g1 f8c5 d2d3 d7d6 c1g5 h7h6 g5f6 d8f6 b1c3 c8g4"
+
+# Metric name -> True when higher is better
+COMPARED_METRICS = {
+    'perft.nps': True,
+    'search.nps': True,
+    'search.seconds': False,
+    'eval.evals_per_sec': True,
+    'eval.cached_evals_per_sec': True,
+    'draw.full_ms': False,
+    'draw.move_ms': False,
+    'startup.engine_ms': False,
+    'startup.uci_ms': False,
+    'startup.main_ms': False,
+    'startup.gui_ms': False,
+}
+
+
+class DummyCanvas:
+    def __init__(self):
+        self.items = 0
+
+    def delete(self, *args):
+        pass
+
+    def create_rectangle(self, *args, **kwargs):
+        self.items += 1
+        return self.items
+
+    def create_image(self, *args, **kwargs):
+        self.items += 1
+        return self.items
+
+    def itemconfigure(self, *args, **kwargs):
+        pass
+
+
+def perft(board, depth):
+    moves = board.get_legal_moves()
+    if depth == 1:
+        return len(moves)
+
+    nodes = 0
+    for move in moves:
+        board.push_move(move)
+        nodes += perft(board, depth - 1)
+        board.pop_move()
+    return nodes
+
+
+def bench_perft(extra_depth=0):
+    results = {}
+    total_nodes = 0
+    total_time = 0.0
+    for name, fen, depth, expected in PERFT_POSITIONS:
+        depth = min(depth + extra_depth, len(expected))
+        board = ChessBoard(None, {}, chess.WHITE)
+        board.set_position(fen)
+        root_hash = board.get_hash()
+
+        start = time.perf_counter()
+        nodes = perft(board, depth)
+        elapsed = time.perf_counter() - start
+
+        results[name] = {
+            'depth': depth,
+            'nodes': nodes,
+            'expected': expected[depth - 1],
+            'ok': nodes == expected[depth - 1] and board.get_hash() == root_hash,
+            'seconds': elapsed,
+        }
+        total_nodes += nodes
+        total_time += elapsed
+
+    results['nps'] = total_nodes / total_time
+    return results
+
+
+def bench_search(depth):
+    results = {}
+    total_nodes = 0
+    total_time = 0.0
+    for name, fen in SEARCH_POSITIONS:
+        board = ChessBoard(None, {}, chess.WHITE)
+        board.set_position(fen)
+        ai = AI(board.get_turn(), board, max_depth=depth)
+
+        start = time.perf_counter()
+        move = ai.make_best_move()
+        elapsed = time.perf_counter() - start
+
+        results[name] = {'depth': depth, 'nodes': ai.nodes, 'seconds': elapsed, 'move': move.uci(),
+                         'eval_cache_hit_rate': ai.eval_cache.hit_rate()}
+        total_nodes += ai.nodes
+        total_time += elapsed
+
+    results['nodes'] = total_nodes
+    results['seconds'] = total_time
+    results['nps'] = total_nodes / total_time
+    return results
+
+
+def bench_pruning(depth):
+    # Nodes needed to finish the same depth on the search positions
+    results = {}
+    for config, enabled in PRUNING_CONFIGS:
+        nodes = 0
+        start = time.perf_counter()
+        for _, fen in SEARCH_POSITIONS:
+            board = ChessBoard(None, {}, chess.WHITE)
+            board.set_position(fen)
+            ai = AI(board.get_turn(), board, max_depth=depth)
+            for option in PRUNING_OPTIONS:
+                setattr(ai, option, option in enabled)
+            ai.make_best_move()
+            nodes += ai.nodes
+        results[config] = {'nodes': nodes, 'seconds': time.perf_counter() - start}
+
+    for config in results.values():
+        config['node_reduction'] = 1 - config['nodes'] / results['off']['nodes']
+    return results
+
+
+def bench_eval(repeats):
+    evaluators = []
+    for _, fen in SEARCH_POSITIONS:
+        board = ChessBoard(None, {}, chess.WHITE)
+        board.set_position(fen)
+        evaluators.append(AI(board.get_turn(), board))
+
+    # score_position skips the eval cache, which would answer every repeat after the first
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for ai in evaluators:
+            ai.score_position()
+    elapsed = time.perf_counter() - start
+
+    cache_start = time.perf_counter()
+    for _ in range(repeats):
+        for ai in evaluators:
+            ai.evaluate_board()
+    cache_elapsed = time.perf_counter() - cache_start
+
+    evals = repeats * len(evaluators)
+    return {
+        'evals': evals,
+        'seconds': elapsed,
+        'evals_per_sec': evals / elapsed,
+        'cached_evals_per_sec': evals / cache_elapsed,
+    }
+
+
+def bench_startup(runs=STARTUP_RUNS):
+    # Best of several cold starts, each in its own interpreter
+    script = ("import sys, time; start = time.perf_counter(); import {module}; "
+              "print((time.perf_counter() - start) * 1000); "
+              f"print(' '.join(name for name in {HEAVY_MODULES!r} if name in sys.modules))")
+    results = {}
+    for module in STARTUP_MODULES:
+        times = []
+        for _ in range(runs):
+            output = subprocess.run([sys.executable, "-c", script.format(module=module)],
+                                    capture_output=True, text=True, check=True).stdout.splitlines()
+            times.append(float(output[0]))
+        results[f"{module}_ms"] = min(times)
+        results[f"{module}_heavy"] = output[1].split() if len(output) > 1 else []
+
+    import_times, gui_times = [], []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", GUI_STARTUP_SCRIPT],
+                                capture_output=True, text=True, check=True).stdout.splitlines()
+        if not output:
+            break
+        import_times.append(float(output[0]))
+        gui_times.append(float(output[1]))
+    if gui_times:
+        results['main_ms'] = min(import_times)
+        results['gui_ms'] = min(gui_times)
+    else:
+        results['gui'] = "skipped, no display"
+    return results
+
+
+def bench_draw():
+    canvas = DummyCanvas()
+    images = {symbol: symbol for symbol in "rnbqkpRNBQKP"}
+    board = ChessBoard(canvas, images, chess.WHITE)
+
+    start = time.perf_counter()
+    board.draw_board()
+    full_ms = (time.perf_counter() - start) * 1000
+
+    moves = DRAW_GAME.split()
+    redraws = board.redraw_count
+    start = time.perf_counter()
+    for move in moves:
+        board.push_move(chess.Move.from_uci(move))
+        board.draw_board()
+    move_ms = (time.perf_counter() - start) * 1000 / len(moves)
+
+    return {
+        'full_ms': full_ms,
+        'move_ms': move_ms,
+        'items_per_move': (board.redraw_count - redraws) / len(moves),
+    }
+
+
+def flatten(results):
+    flat = {}
+    for section, values in results.items():
+        for key, value in values.items():
+            if isinstance(value, (int, float)):
+                flat[f"{section}.{key}"] = value
+    return flat
+
+
+def compare(results, baseline, tolerance):
+    current = flatten(results)
+    previous = flatten(baseline)
+    regressions = []
+    print(f"{'metric':22s} {'baseline':>12s} {'current':>12s} {'change':>8s}")
+    for metric, higher_is_better in COMPARED_METRICS.items():
+        if metric not in current or metric not in previous or not previous[metric]:
+            continue
+        change = (current[metric] - previous[metric]) / previous[metric]
+        worse = -change if higher_is_better else change
+        flag = "  REGRESSION" if worse > tolerance else ""
+        if flag:
+            regressions.append(metric)
+        print(f"{metric:22s} {previous[metric]:12.2f} {current[metric]:12.2f} {change:+7.1%}{flag}")
+    return regressions
+
+
+def run(search_depth, eval_repeats, perft_extra_depth, pruning_depth=None):
+    results = {
+        'perft': bench_perft(perft_extra_depth),
+        'search': bench_search(search_depth),
+        'eval': bench_eval(eval_repeats),
+        'draw': bench_draw(),
+        'startup': bench_startup(),
+    }
+    if pruning_depth:
+        results['pruning'] = bench_pruning(pruning_depth)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark move generation, search, evaluation, drawing and startup")
+    parser.add_argument("--depth", type=int, default=3, help="search depth for nodes/sec")
+    parser.add_argument("--eval-repeats", type=int, default=20000)
+    parser.add_argument("--deep-perft", action="store_true", help="run perft one ply deeper")
+    parser.add_argument("--pruning", type=int, metavar="DEPTH",
+                        help="compare nodes to reach DEPTH with each search pruning option")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="compare against results saved with --output")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed slowdown before flagging")
+    args = parser.parse_args()
+
+    results = run(args.depth, args.eval_repeats, 1 if args.deep_perft else 0, args.pruning)
+    failed = [name for name, value in results['perft'].items() if isinstance(value, dict) and not value['ok']]
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+
+    if failed:
+        print(f"Perft mismatch: {', '.join(failed)}")
+    sys.exit(1 if failed or regressions else 0)
@@ -0,0 +1,252 @@
+import argparse
+import os
+
+import chess
+
+BITBASE_DIR = "bitbases"
+ENDINGS = {chess.PAWN: "kpk", chess.ROOK: "krk", chess.QUEEN: "kqk"}
+
+# Index bits: side to move (0 = strong side), strong king, weak king, piece square
+TABLE_SIZE = 2 * 64 * 64 * 64
+WHITE_TO_MOVE = 0
+BLACK_TO_MOVE = 1
+
+WIN = 1
+DRAW = 0
+LOSS = -1
+
+KING_MOVES = [
+    [target for target in chess.SQUARES if chess.square_distance(square, target) == 1]
+    for square in chess.SQUARES
+]
+ROOK_DIRECTIONS = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+QUEEN_DIRECTIONS = ROOK_DIRECTIONS + [(1, 1), (1, -1), (-1, 1), (-1, -1)]
+
+
+def build_rays(directions):
+    rays = []
+    for square in chess.SQUARES:
+        square_rays = []
+        for file_step, rank_step in directions:
+            ray = []
+            file, rank = chess.square_file(square) + file_step, chess.square_rank(square) + rank_step
+            while 0 <= file < 8 and 0 <= rank < 8:
+                ray.append(chess.square(file, rank))
+                file, rank = file + file_step, rank + rank_step
+            square_rays.append(ray)
+        rays.append(square_rays)
+    return rays
+
+
+RAYS = {chess.ROOK: build_rays(ROOK_DIRECTIONS), chess.QUEEN: build_rays(QUEEN_DIRECTIONS)}
+
+
+def index(side_to_move, strong_king, weak_king, piece_square):
+    return (side_to_move << 18) | (strong_king << 12) | (weak_king << 6) | piece_square
+
+
+def attacks(piece_type, piece_square, target, blocker):
+    if piece_type == chess.PAWN:
+        return (chess.square_rank(target) == chess.square_rank(piece_square) + 1
+                and abs(chess.square_file(target) - chess.square_file(piece_square)) == 1)
+
+    for ray in RAYS[piece_type][piece_square]:
+        for square in ray:
+            if square == target:
+                return True
+            if square == blocker:
+                break
+    return False
+
+
+def is_legal(side_to_move, strong_king, weak_king, piece_square, piece_type):
+    if len({strong_king, weak_king, piece_square}) < 3:
+        return False
+    if chess.square_distance(strong_king, weak_king) < 2:
+        return False
+    if piece_type == chess.PAWN and chess.square_rank(piece_square) in (0, 7):
+        return False
+    # The side that just moved can't have left the weak king in check
+    if side_to_move == WHITE_TO_MOVE and attacks(piece_type, piece_square, weak_king, strong_king):
+        return False
+    return True
+
+
+def strong_moves(strong_king, weak_king, piece_square, piece_type):
+    # Yields (strong king, piece square, promotion) after each move of the strong side
+    for target in KING_MOVES[strong_king]:
+        if target != piece_square and chess.square_distance(target, weak_king) > 1:
+            yield target, piece_square, None
+
+    if piece_type == chess.PAWN:
+        target = piece_square + 8
+        if target in (strong_king, weak_king):
+            return
+        if chess.square_rank(target) == 7:
+            yield strong_king, target, chess.QUEEN
+            yield strong_king, target, chess.ROOK
+            return
+        yield strong_king, target, None
+        if chess.square_rank(piece_square) == 1 and target + 8 not in (strong_king, weak_king):
+            yield strong_king, target + 8, None
+        return
+
+    for ray in RAYS[piece_type][piece_square]:
+        for target in ray:
+            if target in (strong_king, weak_king):
+                break
+            yield strong_king, target, None
+
+
+def generate(piece_type, promotion_tables=None):
+    # Retrograde analysis: the pass in which a position is first resolved as a
+    # win is its distance to mate, or to a winning promotion for KPK
+    wins = bytearray(TABLE_SIZE)
+    unresolved_white = []
+    unresolved_black = []
+
+    for strong_king in chess.SQUARES:
+        for weak_king in chess.SQUARES:
+            for piece_square in chess.SQUARES:
+                for side_to_move in (WHITE_TO_MOVE, BLACK_TO_MOVE):
+                    if is_legal(side_to_move, strong_king, weak_king, piece_square, piece_type):
+                        position = (strong_king, weak_king, piece_square)
+                        if side_to_move == WHITE_TO_MOVE:
+                            unresolved_white.append(position)
+                        else:
+                            unresolved_black.append(position)
+
+    # Weak king moves, computed once: None marks an escape by capturing the piece
+    weak_moves = {}
+    for strong_king, weak_king, piece_square in unresolved_black:
+        targets = []
+        for target in KING_MOVES[weak_king]:
+            if chess.square_distance(target, strong_king) < 2:
+                continue
+            if target == piece_square:
+                targets.append(None)
+            elif not attacks(piece_type, piece_square, target, strong_king):
+                targets.append(target)
+        weak_moves[(strong_king, weak_king, piece_square)] = targets
+
+    distance = 0
+    changed = True
+    while changed:
+        changed = False
+        distance += 1
+
+        still_black = []
+        for position in unresolved_black:
+            strong_king, weak_king, piece_square = position
+            targets = weak_moves[position]
+            if not targets:
+                won = attacks(piece_type, piece_square, weak_king, strong_king)
+            else:
+                won = all(
+                    target is not None
+                    and wins[index(WHITE_TO_MOVE, strong_king, target, piece_square)]
+                    for target in targets)
+            if won:
+                wins[index(BLACK_TO_MOVE, *position)] = distance
+                changed = True
+            else:
+                still_black.append(position)
+        unresolved_black = still_black
+
+        still_white = []
+        for position in unresolved_white:
+            strong_king, weak_king, piece_square = position
+            won = False
+            for king, square, promotion in strong_moves(strong_king, weak_king, piece_square, piece_type):
+                if promotion is not None:
+                    table = promotion_tables[promotion]
+                    won = bool(table[index(BLACK_TO_MOVE, king, weak_king, square)])
+                else:
+                    won = bool(wins[index(BLACK_TO_MOVE, king, weak_king, square)])
+                if won:
+                    break
+            if won:
+                wins[index(WHITE_TO_MOVE, *position)] = distance
+                changed = True
+            else:
+                still_white.append(position)
+        unresolved_white = still_white
+
+    return wins
+
+
+def generate_all(directory=BITBASE_DIR):
+    os.makedirs(directory, exist_ok=True)
+    tables = {}
+    # KPK needs the queen and rook tables to score promotions
+    for piece_type in (chess.QUEEN, chess.ROOK, chess.PAWN):
+        name = ENDINGS[piece_type]
+        print(f"Generating {name}...")
+        tables[piece_type] = generate(piece_type, tables)
+        with open(os.path.join(directory, name + ".bin"), "wb") as f:
+            f.write(tables[piece_type])
+    return tables
+
+
+class Bitbases:
+    def __init__(self, directory=BITBASE_DIR):
+        self.tables = {}
+        for piece_type, name in ENDINGS.items():
+            path = os.path.join(directory, name + ".bin")
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    self.tables[piece_type] = f.read()
+
+    def lookup(self, board):
+        # (distance, strong side to move), or None outside KPK/KRK/KQK
+        if chess.popcount(board.occupied) != 3 or board.pawns & chess.BB_BACKRANKS:
+            return None
+
+        strong_color = strong_side(board)
+        piece_square = chess.lsb(board.occupied_co[strong_color] & ~board.kings)
+        piece_type = board.piece_type_at(piece_square)
+        table = self.tables.get(piece_type)
+        if table is None:
+            return None
+
+        strong_king = board.king(strong_color)
+        weak_king = board.king(not strong_color)
+        if strong_color == chess.BLACK:
+            # Mirror so the strong side is always white
+            strong_king, weak_king, piece_square = (
+                chess.square_mirror(strong_king), chess.square_mirror(weak_king),
+                chess.square_mirror(piece_square))
+
+        side_to_move = WHITE_TO_MOVE if board.turn == strong_color else BLACK_TO_MOVE
+        return table[index(side_to_move, strong_king, weak_king, piece_square)], side_to_move == WHITE_TO_MOVE
+
+    def probe(self, board):
+        # WIN/DRAW/LOSS for the side to move, or None outside KPK/KRK/KQK
+        entry = self.lookup(board)
+        if entry is None:
+            return None
+        distance, strong_to_move = entry
+        if not distance:
+            return DRAW
+        return WIN if strong_to_move else LOSS
+
+
+def strong_side(board):
+    return chess.WHITE if chess.popcount(board.occupied_co[chess.WHITE]) == 2 else chess.BLACK
+
+
+BITBASES = None
+
+
+def get_bitbases():
+    global BITBASES
+    if BITBASES is None:
+        BITBASES = Bitbases()
+    return BITBASES
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate KPK, KRK and KQK bitbases")
+    parser.add_argument("--output", default=BITBASE_DIR)
+    args = parser.parse_args()
+    generate_all(args.output)
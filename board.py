@@ -1,11 +1,88 @@
+import copy
 import chess
-import tkinter as tk
-import tkinter.simpledialog as simpledialog
-from PIL import Image, ImageTk
+import chess.polyglot
 
 BOARD_SIZE = 540
 SQUARE_SIZE = BOARD_SIZE // 8
 
+PIECE_VALUES = {
+    chess.PAWN: 1,
+    chess.KNIGHT: 3,
+    chess.BISHOP: 3,
+    chess.ROOK: 5,
+    chess.QUEEN: 9,
+    chess.KING: 0
+}
+
+CENTER_SQUARES = [chess.E4, chess.D4, chess.E5, chess.D5]
+CENTER_BONUS = 0.5
+DEVELOPMENT_BONUS = 0.1
+UNDEVELOPED_ROOK_PENALTY = 0.2
+KING_SAFETY_BONUS = 0.5
+CASTLED_KING_SQUARES = [chess.G1, chess.G8, chess.C1, chess.C8]
+
+STARTING_SQUARES = {
+    chess.WHITE: {
+        chess.KNIGHT: [chess.B1, chess.G1],
+        chess.BISHOP: [chess.C1, chess.F1],
+        chess.ROOK: [chess.A1, chess.H1]
+    },
+    chess.BLACK: {
+        chess.KNIGHT: [chess.B8, chess.G8],
+        chess.BISHOP: [chess.C8, chess.F8],
+        chess.ROOK: [chess.A8, chess.H8]
+    }
+}
+
+# Marks a cached position whose status hasn't been computed yet
+UNKNOWN_STATUS = object()
+
+# Evaluation terms are kept in tenths so incremental updates stay exact
+EVAL_SCALE = 10
+
+ZOBRIST = chess.polyglot.ZobristHasher(chess.polyglot.POLYGLOT_RANDOM_ARRAY)
+
+
+def piece_index(piece, square):
+    return 64 * ((piece.piece_type - 1) * 2 + piece.color) + square
+
+
+def tenths(value):
+    return round(value * EVAL_SCALE)
+
+
+def build_eval_weights(color):
+    # Every term is converted to tenths before it is added, so a full-board
+    # scan over the same terms and the incremental sums agree exactly
+    weights = [0] * 768
+    starting_squares = STARTING_SQUARES[color]
+    for piece_type in chess.PIECE_TYPES:
+        for piece_color in chess.COLORS:
+            piece = chess.Piece(piece_type, piece_color)
+            sign = 1 if piece_color == color else -1
+            for square in chess.SQUARES:
+                score = sign * tenths(PIECE_VALUES[piece_type])
+
+                if square in CENTER_SQUARES:
+                    score += sign * tenths(CENTER_BONUS)
+
+                if piece_type in [chess.KNIGHT, chess.BISHOP, chess.ROOK]:
+                    if square not in starting_squares[piece_type]:
+                        score += tenths(DEVELOPMENT_BONUS)
+
+                if piece_type == chess.ROOK and square in starting_squares[piece_type]:
+                    score -= tenths(UNDEVELOPED_ROOK_PENALTY)
+
+                if piece_type == chess.KING and piece_color == color and square in CASTLED_KING_SQUARES:
+                    score += tenths(KING_SAFETY_BONUS)
+
+                weights[piece_index(piece, square)] = score
+    return weights
+
+
+# Per-perspective piece-square weights, indexed like the Zobrist piece keys
+EVAL_WEIGHTS = [build_eval_weights(chess.BLACK), build_eval_weights(chess.WHITE)]
+
 class ChessBoard:
     def __init__(self, canvas, images, starting_color, root=None):
         self.board = chess.Board()
@@ -16,33 +93,70 @@ class ChessBoard:
         self.starting_color = starting_color
         self.flip_board = (self.starting_color == chess.BLACK)
         self.root = root
-        print(self.board)
+        self.piece_items = {}
+        self.highlight_items = {}
+        self.drawn_pieces = {}
+        self.drawn_highlights = set()
+        self.drawn_images = None
+        self.drawn_square_size = None
+        self.redraw_count = 0
+        self.rebuild_state()
 
     def draw_board(self):
+        if self.canvas is None:
+            return
+        if self.images is not self.drawn_images or SQUARE_SIZE != self.drawn_square_size:
+            self.build_canvas()
+
+        # Only touch the squares whose piece or highlight changed since the last draw
+        pieces = {square: piece.symbol() for square, piece in self.board.piece_map().items()}
+        for square in self.drawn_pieces.keys() | pieces.keys():
+            symbol = pieces.get(square)
+            if symbol == self.drawn_pieces.get(square):
+                continue
+            if symbol is None:
+                self.canvas.itemconfigure(self.piece_items[square], state='hidden')
+            else:
+                self.canvas.itemconfigure(
+                    self.piece_items[square], image=self.images[symbol], state='normal')
+            self.redraw_count += 1
+
+        for square in self.drawn_highlights ^ self.possible_moves:
+            state = 'normal' if square in self.possible_moves else 'hidden'
+            self.canvas.itemconfigure(self.highlight_items[square], state=state)
+            self.redraw_count += 1
+
+        self.drawn_pieces = pieces
+        self.drawn_highlights = set(self.possible_moves)
+
+    def build_canvas(self):
         self.canvas.delete('all')
-        for row in range(8):
-            for col in range(8):
+        self.piece_items = {}
+        self.highlight_items = {}
+
+        # Squares, then pieces, then highlights, so the stacking order never changes
+        for layer in range(3):
+            for square in chess.SQUARES:
+                row, col = divmod(square, 8)
                 display_row, display_col = self.board_to_display(row, col)
                 x1, y1 = display_col * SQUARE_SIZE, display_row * SQUARE_SIZE
                 x2, y2 = x1 + SQUARE_SIZE, y1 + SQUARE_SIZE
-                color = '#eee' if (display_row + display_col) % 2 == 0 else '#964B00'
-                self.canvas.create_rectangle(x1, y1, x2, y2, fill=color)
-
-                square = row * 8 + col
-                piece = self.get_piece_at(square)
-                if piece:
-                    self.canvas.create_image(
-                        x1, y1, anchor=tk.NW, image=self.images[piece.symbol()]
-                    )
-
-        for move_square in self.possible_moves:
-            row, col = divmod(move_square, 8)
-            display_row, display_col = self.board_to_display(row, col)
-            x1, y1 = display_col * SQUARE_SIZE, display_row * SQUARE_SIZE
-            x2, y2 = x1 + SQUARE_SIZE, y1 + SQUARE_SIZE
-            self.canvas.create_rectangle(
-                x1, y1, x2, y2, outline='yellow', width=2
-            )
+
+                if layer == 0:
+                    color = '#eee' if (display_row + display_col) % 2 == 0 else '#964B00'
+                    self.canvas.create_rectangle(x1, y1, x2, y2, fill=color)
+                elif layer == 1:
+                    self.piece_items[square] = self.canvas.create_image(
+                        x1, y1, anchor='nw', state='hidden')
+                else:
+                    self.highlight_items[square] = self.canvas.create_rectangle(
+                        x1, y1, x2, y2, outline='yellow', width=2, state='hidden')
+                self.redraw_count += 1
+
+        self.drawn_images = self.images
+        self.drawn_square_size = SQUARE_SIZE
+        self.drawn_pieces = {}
+        self.drawn_highlights = set()
 
     def board_to_display(self, row, col):
         if self.starting_color == chess.WHITE:
@@ -60,25 +174,88 @@ class ChessBoard:
         return self.board.piece_at(square)
 
     def make_move(self, move):
-        if move in self.board.legal_moves:
-            self.board.push(move)
+        if self.is_legal(move):
+            self.push_move(move)
+
+    def cache_entry(self):
+        # Legal moves, from-square index and status, filled in on first use
+        # for the current position and dropped again on pop_move
+        entry = self.move_cache[-1]
+        if entry is None:
+            entry = self.move_cache[-1] = [None, None, UNKNOWN_STATUS]
+        return entry
 
     def get_legal_moves(self):
-        return list(self.board.legal_moves)
+        entry = self.cache_entry()
+        if entry[0] is None:
+            entry[0] = list(self.board.legal_moves)
+        return entry[0]
+
+    def get_moves_from(self, square):
+        entry = self.cache_entry()
+        if entry[1] is None:
+            by_from = {}
+            for move in self.get_legal_moves():
+                by_from.setdefault(move.from_square, []).append(move)
+            entry[1] = by_from
+        return entry[1].get(square, [])
+
+    def is_legal(self, move):
+        return move is not None and move in self.get_moves_from(move.from_square)
 
     def get_turn(self):
         return self.board.turn
 
+    def get_ply(self):
+        return len(self.board.move_stack)
+
+    def status(self):
+        # The chess.Termination ending the game here, or None while it goes on
+        entry = self.cache_entry()
+        if entry[2] is UNKNOWN_STATUS:
+            entry[2] = self.compute_status(entry[0])
+        return entry[2]
+
+    def compute_status(self, moves):
+        board = self.board
+        # Without a cached move list, one legal move is enough to tell
+        has_moves = bool(moves) if moves is not None else any(board.generate_legal_moves())
+        in_check = board.is_check()
+
+        if not has_moves:
+            return chess.Termination.CHECKMATE if in_check else chess.Termination.STALEMATE
+        # After stalemate, unlike outcome(), so a stalemate with bare kings or
+        # minor pieces still reports (and scores) as a stalemate
+        if board.is_insufficient_material():
+            return chess.Termination.INSUFFICIENT_MATERIAL
+        if board.halfmove_clock >= 150:
+            return chess.Termination.SEVENTYFIVE_MOVES
+        if self.repetition_count() >= 5:
+            return chess.Termination.FIVEFOLD_REPETITION
+        return None
+
+    def repetition_count(self):
+        # Earlier occurrences can only be within the reversible moves, with the same side to move
+        if self.board.halfmove_clock < 4:
+            return 1
+        first = max(0, len(self.hash_stack) - 1 - self.board.halfmove_clock)
+        return self.hash_stack[first:][::-2].count(self.hash_stack[-1])
+
     def is_game_over(self):
-        return self.board.is_game_over()
+        return self.status() is not None
 
     def is_stalemate(self):
-        return self.board.is_stalemate()
+        return self.status() == chess.Termination.STALEMATE
 
     def is_check(self):
         return self.board.is_check()
 
+    def is_capture(self, move):
+        return self.board.is_capture(move)
+
     def change_resolution(self):
+        import tkinter.simpledialog as simpledialog
+
         new_resolution = simpledialog.askinteger("Resolution", "Enter new resolution (e.g., 500):", parent=self.root)
         if new_resolution:
             global BOARD_SIZE
@@ -94,43 +271,114 @@ class ChessBoard:
             self.draw_board()
 
     def load_images(self):
-        size = (SQUARE_SIZE, SQUARE_SIZE)
-        return {
-            'r': self.load_image('images/rB.png', size),
-            'n': self.load_image('images/nB.png', size),
-            'b': self.load_image('images/bB.png', size),
-            'q': self.load_image('images/qB.png', size),
-            'k': self.load_image('images/kB.png', size),
-            'p': self.load_image('images/pB.png', size),
-            'R': self.load_image('images/rW.png', size),
-            'N': self.load_image('images/nW.png', size),
-            'B': self.load_image('images/bW.png', size),
-            'Q': self.load_image('images/qW.png', size),
-            'K': self.load_image('images/kW.png', size),
-            'P': self.load_image('images/pW.png', size),
-        }
-
-    def load_image(self, filename, size):
-        return ImageTk.PhotoImage(Image.open(filename).resize(size))
+        # Sprites pull in PIL, which headless boards never need
+        from sprites import SPRITES
+        return SPRITES.images(SQUARE_SIZE)
 
     def reset_board(self):
         self.board.reset()
+        self.rebuild_state()
+
+    def copy(self):
+        clone = copy.copy(self)
+        clone.board = self.board.copy()
+        clone.hash_stack = list(self.hash_stack)
+        clone.eval_stack = list(self.eval_stack)
+        clone.move_cache = list(self.move_cache)
+        clone.possible_moves = set(self.possible_moves)
+        # Snapshots are for searching and never draw
+        clone.canvas = None
+        return clone
+
+    def get_position(self):
+        return self.board.root().fen(), [move.uci() for move in self.board.move_stack]
+
+    def set_position(self, fen, moves=()):
+        self.board.set_fen(fen)
+        self.rebuild_state()
+        for move in moves:
+            self.push_move(chess.Move.from_uci(move))
+
+    def rebuild_state(self):
+        black_score = white_score = 0
+        for square, piece in self.board.piece_map().items():
+            index = piece_index(piece, square)
+            black_score += EVAL_WEIGHTS[chess.BLACK][index]
+            white_score += EVAL_WEIGHTS[chess.WHITE][index]
+
+        self.hash_stack = [ZOBRIST(self.board)]
+        self.eval_stack = [(black_score, white_score)]
+        self.move_cache = [None]
+
+    def get_hash(self):
+        return self.hash_stack[-1]
+
+    def get_eval(self, color):
+        return self.eval_stack[-1][color] / EVAL_SCALE
+
+    def square_changes(self, move):
+        if not move:
+            return []
+
+        board = self.board
+        piece = board.piece_at(move.from_square)
+        moved = chess.Piece(move.promotion, piece.color) if move.promotion else piece
+        changes = [
+            (move.from_square, piece, None),
+            (move.to_square, board.piece_at(move.to_square), moved),
+        ]
+
+        if board.is_en_passant(move):
+            captured = chess.square(chess.square_file(move.to_square), chess.square_rank(move.from_square))
+            changes.append((captured, board.piece_at(captured), None))
+        elif board.is_castling(move):
+            rank = chess.square_rank(move.from_square)
+            if chess.square_file(move.to_square) == 6:
+                rook_from, rook_to = chess.square(7, rank), chess.square(5, rank)
+            else:
+                rook_from, rook_to = chess.square(0, rank), chess.square(3, rank)
+            rook = board.piece_at(rook_from)
+            changes.append((rook_from, rook, None))
+            changes.append((rook_to, None, rook))
+
+        return changes
 
     def find_king(self, color):
-        for square in chess.SQUARES:
-            piece = self.get_piece_at(square)
-            if piece is not None and piece.piece_type == chess.KING and piece.color == color:
-                return square
-        return None
+        return self.board.king(color)
 
     def push_move(self, move):
+        key = self.hash_stack[-1]
+        black_score, white_score = self.eval_stack[-1]
+        black_weights, white_weights = EVAL_WEIGHTS
+        for square, old, new in self.square_changes(move):
+            if old:
+                index = piece_index(old, square)
+                key ^= ZOBRIST.array[index]
+                black_score -= black_weights[index]
+                white_score -= white_weights[index]
+            if new:
+                index = piece_index(new, square)
+                key ^= ZOBRIST.array[index]
+                black_score += black_weights[index]
+                white_score += white_weights[index]
+        key ^= ZOBRIST.hash_castling(self.board) ^ ZOBRIST.hash_ep_square(self.board)
+
         self.board.push(move)
 
+        key ^= ZOBRIST.hash_castling(self.board) ^ ZOBRIST.hash_ep_square(self.board)
+        key ^= ZOBRIST.array[780]
+        self.hash_stack.append(key)
+        self.eval_stack.append((black_score, white_score))
+        self.move_cache.append(None)
+
     def is_checkmate(self):
-        return self.board.is_checkmate()
+        return self.status() == chess.Termination.CHECKMATE
 
     def pop_move(self):
         self.board.pop()
+        self.hash_stack.pop()
+        self.eval_stack.pop()
+        self.move_cache.pop()
 
     def is_pawn_promotion(self, move):
         return self.board.piece_at(move.from_square).piece_type == chess.PAWN and chess.square_rank(move.to_square) in [0, 7]
@@ -138,6 +386,11 @@ class ChessBoard:
     def get_attackers(self, square, attacking_color):
         return [sq for sq in chess.SQUARES if self.board.is_attacked_by(attacking_color, square)]
 
+    def get_last_move(self):
+        if len(self.board.move_stack) > 0:
+            return self.board.peek()
+        return None
+
     def get_last_move_origin(self, piece):
         if len(self.board.move_stack) > 0:
             last_move = self.board.peek()
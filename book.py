@@ -0,0 +1,104 @@
+import argparse
+import os
+import random
+import struct
+from collections import defaultdict
+
+import chess
+import chess.polyglot
+
+BOOK_PATH = "book.bin"
+
+# Polyglot entry layout: key, move, weight, learn (big endian, sorted by key)
+ENTRY_STRUCT = struct.Struct(">QHHI")
+PROMOTION_CODES = {chess.KNIGHT: 1, chess.BISHOP: 2, chess.ROOK: 3, chess.QUEEN: 4}
+RESULT_WEIGHTS = {"1-0": (2, 0), "0-1": (0, 2), "1/2-1/2": (1, 1)}
+
+
+class OpeningBook:
+    def __init__(self, path=BOOK_PATH):
+        # The file is memory-mapped and binary searched, nothing is parsed up front
+        self.reader = chess.polyglot.open_reader(path)
+        self.hits = 0
+        self.misses = 0
+
+    def probe(self, board):
+        try:
+            entry = self.reader.weighted_choice(board.board, random=random)
+        except IndexError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry.move
+
+    def close(self):
+        self.reader.close()
+
+
+def open_book(path=BOOK_PATH):
+    if path and os.path.exists(path):
+        return OpeningBook(path)
+    return None
+
+
+def encode_move(board, move):
+    to_square = move.to_square
+    if board.is_castling(move):
+        # Polyglot writes castling as the king capturing its own rook
+        rook_file = 7 if chess.square_file(move.to_square) == 6 else 0
+        to_square = chess.square(rook_file, chess.square_rank(move.from_square))
+    return to_square | (move.from_square << 6) | (PROMOTION_CODES.get(move.promotion, 0) << 12)
+
+
+def build_book(pgn_paths, output, max_ply=20):
+    # chess.pgn drags in chess.engine and asyncio, which probing never needs
+    import chess.pgn
+
+    weights = defaultdict(lambda: defaultdict(int))
+    games = 0
+
+    for pgn_path in pgn_paths:
+        with open(pgn_path) as pgn_file:
+            while True:
+                game = chess.pgn.read_game(pgn_file)
+                if game is None:
+                    break
+                result = RESULT_WEIGHTS.get(game.headers.get("Result"))
+                if result is None:
+                    continue
+
+                games += 1
+                board = game.board()
+                for ply, move in enumerate(game.mainline_moves()):
+                    if ply >= max_ply:
+                        break
+                    # White's moves score by white's result, black's by black's
+                    weight = result[0] if board.turn == chess.WHITE else result[1]
+                    weights[chess.polyglot.zobrist_hash(board)][encode_move(board, move)] += weight
+                    board.push(move)
+
+    entries = []
+    for key, moves in weights.items():
+        top = max(moves.values())
+        for raw_move, weight in moves.items():
+            if weight > 0:
+                scaled = max(1, weight * 0xFFFF // top) if top > 0xFFFF else weight
+                entries.append((key, -scaled, raw_move))
+    entries.sort()
+
+    with open(output, "wb") as f:
+        for key, negative_weight, raw_move in entries:
+            f.write(ENTRY_STRUCT.pack(key, raw_move, -negative_weight, 0))
+
+    return games, len(weights), len(entries)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build a polyglot opening book from PGN files")
+    parser.add_argument("pgn", nargs="+")
+    parser.add_argument("-o", "--output", default=BOOK_PATH)
+    parser.add_argument("--max-ply", type=int, default=20)
+    args = parser.parse_args()
+
+    games, positions, entries = build_book(args.pgn, args.output, args.max_ply)
+    print(f"{games} games, {positions} positions, {entries} entries written to {args.output}")
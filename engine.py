@@ -0,0 +1,457 @@
+import copy
+import random
+import time
+
+import chess
+
+from transposition import TranspositionTable, EvalCache, EXACT, LOWER, UPPER, EVAL_COLOR_KEYS
+from ordering import MoveOrderer
+from search_stats import SearchStats, profile_call
+from book import BOOK_PATH, open_book
+from bitbase import get_bitbases
+
+MAX_SEARCH_DEPTH = 32
+AI_TIME_LIMIT_MS = 1000
+
+# Smaller than any difference between two evaluations, so root moves that tie
+# with the best one still get exact scores
+ROOT_TIE_MARGIN = 0.05
+
+# Bitbase wins score above any material balance but below mate, less the
+# distance to mate; KPK distances only reach promotion, so they rank lower
+BITBASE_WIN_SCORE = 1000
+PAWN_ENDING_DISTANCE = 100
+
+# Width of the zero windows used by PVS and the pruning tests, well below the
+# 0.1 step between evaluations
+NULL_WINDOW = 0.01
+NULL_MOVE_REDUCTION = 2
+NULL_MOVE_MIN_DEPTH = 3
+LMR_MIN_DEPTH = 3
+LMR_MIN_MOVES = 3
+ASPIRATION_WINDOW = 1.0
+
+
+def random_move(board):
+    legal_moves = board.get_legal_moves()
+    if not legal_moves:
+        return None
+
+    move = random.choice(legal_moves)
+    if board.is_pawn_promotion(move):
+        move = chess.Move(move.from_square, move.to_square, promotion=chess.QUEEN)
+    return move
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class AI:
+    def __init__(self, color, board, max_depth=2, hash_size_mb=16, time_limit_ms=None,
+                 workers=1, stats_log=None, book_path=BOOK_PATH, eval_cache_mb=4):
+        self.board = board
+        self.color = color
+        self.max_depth = max_depth
+        self.time_limit_ms = time_limit_ms
+        self.deadline = None
+        self.next_time_check = 0
+        self.stop_requested = False
+        # Cleared while the first iteration runs, which always completes
+        self.interruptible = True
+        # Set by the parallel search so one stop reaches every worker process
+        self.stop_event = None
+        self.completed_depth = 0
+        self.hash_size_mb = hash_size_mb
+        self.tt = TranspositionTable(hash_size_mb)
+        self.eval_cache = EvalCache(eval_cache_mb)
+        self.orderer = MoveOrderer()
+        self.workers = workers
+        self.parallel = None
+        self.nodes = 0
+        self.stats = SearchStats()
+        self.stats_log = stats_log
+        self.book = open_book(book_path)
+        self.bitbases = get_bitbases()
+        # Selective search, each can be switched off on its own
+        self.pvs = True
+        self.null_move = True
+        self.lmr = True
+        self.aspiration = True
+        self.past_moves = []
+
+    def evaluate_board(self):
+        # Scores only depend on the position, so they're cached across
+        # sibling subtrees and consecutive searches
+        key = self.board.get_hash() ^ EVAL_COLOR_KEYS[self.color]
+        evaluation = self.eval_cache.probe(key)
+        if evaluation is None:
+            evaluation = self.score_position()
+            self.eval_cache.store(key, evaluation)
+        return evaluation
+
+    def score_position(self):
+        # Check for checkmate or stalemate
+        status = self.board.status()
+        if status == chess.Termination.CHECKMATE:
+            if self.board.get_turn() == self.color:
+                return -float('inf')  # AI is losing
+            else:
+                return float('inf')   # AI is winning
+
+        if status == chess.Termination.STALEMATE:
+            return -50
+
+        entry = self.bitbases.lookup(self.board.board)
+        if entry is not None:
+            return self.bitbase_score(*entry)
+
+        # Material, center control, development and king safety are kept
+        # up to date by ChessBoard.push_move/pop_move
+        return self.board.get_eval(self.color)
+
+    def bitbase_score(self, distance, strong_to_move):
+        if not distance:
+            return 0
+        if self.board.board.pawns:
+            distance += PAWN_ENDING_DISTANCE
+        winner = self.board.get_turn() if strong_to_move else not self.board.get_turn()
+        score = BITBASE_WIN_SCORE - distance
+        return score if winner == self.color else -score
+
+    def bitbase_move(self):
+        # One ply over the bitbase is enough to play these endings perfectly
+        if self.bitbases.lookup(self.board.board) is None:
+            return None
+
+        best_move, best_eval = None, -float('inf')
+        for move in self.board.get_legal_moves():
+            self.board.push_move(move)
+            evaluation = self.evaluate_board()
+            self.board.pop_move()
+            if best_move is None or evaluation > best_eval:
+                best_move, best_eval = move, evaluation
+        return best_move
+
+    def search_options(self):
+        return {'pvs': self.pvs, 'null_move': self.null_move, 'lmr': self.lmr}
+
+    def search_root(self, depth, alpha=-float('inf'), beta=float('inf')):
+        self.nodes += 1
+        key = self.board.get_hash()
+        entry = self.tt.probe(key)
+        hash_move = entry[3] if entry else None
+        moves = self.orderer.order_moves(self.board, self.board.get_legal_moves(), 0, hash_move)
+
+        if self.workers > 1 and len(moves) > 1:
+            if self.parallel is None:
+                from parallel import ParallelSearch
+                self.parallel = ParallelSearch(self.workers, self.hash_size_mb)
+            best_eval, best_move = self.parallel.search_root(self, moves, depth, alpha, beta)
+        else:
+            best_eval, best_move = -float('inf'), None
+            for move in moves:
+                evaluation = self.search_root_move(move, depth, best_eval, alpha, beta)
+                if self.is_better_root_move(move, evaluation, best_move, best_eval):
+                    best_eval, best_move = evaluation, move
+                # A fail high is all the aspiration search needs; searching on
+                # would give the later moves a window with alpha above beta
+                if best_eval >= beta:
+                    break
+
+        self.store_result(key, depth, best_eval, best_move, alpha, beta)
+        return best_eval, best_move
+
+    def search_root_move(self, move, depth, best_eval, alpha=-float('inf'), beta=float('inf')):
+        # Callers stop at a fail high, so the raised bound stays below beta
+        self.board.push_move(move)
+        evaluation, _ = self.minimax(depth - 1, max(alpha, best_eval - ROOT_TIE_MARGIN), beta, False, 1)
+        self.board.pop_move()
+        return evaluation
+
+    def aspiration_search(self, depth, scores):
+        # Search a narrow window around an earlier iteration's score first, and
+        # the full window again only if the score falls outside it. Without a
+        # quiescence search scores swing between odd and even depths, so the
+        # window is centred on the last iteration of the same parity
+        previous_score = scores[-2] if len(scores) >= 2 else None
+        if self.aspiration and previous_score is not None and abs(previous_score) != float('inf'):
+            alpha, beta = previous_score - ASPIRATION_WINDOW, previous_score + ASPIRATION_WINDOW
+            score, move = self.search_root(depth, alpha, beta)
+            if alpha < score < beta:
+                return score, move
+        return self.search_root(depth)
+
+    def is_better_root_move(self, move, evaluation, best_move, best_eval):
+        if best_move is None or evaluation > best_eval:
+            return True
+        # Break ties by generation order, so the result doesn't depend on how
+        # the moves were ordered or split across workers
+        if evaluation == best_eval:
+            legal_moves = self.board.get_legal_moves()
+            return legal_moves.index(move) < legal_moves.index(best_move)
+        return False
+
+    def fork(self, board):
+        # Shares the TT, move ordering tables and worker pool with this AI
+        searcher = copy.copy(self)
+        searcher.board = board
+        searcher.stats = SearchStats()
+        searcher.stop_requested = False
+        return searcher
+
+    def stop(self):
+        self.stop_requested = True
+
+    def close(self):
+        if self.parallel is not None:
+            self.parallel.close()
+            self.parallel = None
+        if self.book is not None:
+            self.book.close()
+            self.book = None
+
+    def minimax(self, depth, alpha, beta, maximizing_player, ply=0, allow_null=True):
+        self.nodes += 1
+        self.check_time()
+
+        key = self.board.get_hash()
+        alpha_orig, beta_orig = alpha, beta
+
+        hash_move = None
+        entry = self.tt.probe(key)
+        if entry is not None:
+            tt_depth, tt_flag, tt_value, tt_move = entry
+            hash_move = tt_move
+            if tt_depth >= depth:
+                if tt_flag == EXACT:
+                    self.tt.cutoffs += 1
+                    return tt_value, tt_move
+                elif tt_flag == LOWER:
+                    alpha = max(alpha, tt_value)
+                else:
+                    beta = min(beta, tt_value)
+                if beta <= alpha:
+                    self.tt.cutoffs += 1
+                    return tt_value, tt_move
+
+        if depth == 0 or self.board.status() is not None:
+            self.stats.leaf_evals += 1
+            evaluation = self.evaluate_board()
+            # Plain leaves are left to the eval cache so the TT keeps interior nodes
+            if depth > 0:
+                self.tt.store(key, depth, EXACT, evaluation, None)
+            return evaluation, None
+
+        legal_moves = self.orderer.order_moves(
+            self.board, self.board.get_legal_moves(), ply, hash_move)
+        best_move = None
+
+        in_check = self.board.is_check()
+        if allow_null and not in_check and self.null_move_cutoff(depth, alpha, beta, maximizing_player, ply):
+            return (beta, None) if maximizing_player else (alpha, None)
+
+        if maximizing_player:
+            max_eval = -float('inf')
+            for index, move in enumerate(legal_moves):
+                quiet = not in_check and not self.board.is_capture(move) and not move.promotion
+                self.board.push_move(move)
+                evaluation = self.search_child(depth, alpha, beta, True, ply, index, quiet)
+                self.board.pop_move()
+
+                if evaluation > max_eval:
+                    max_eval = evaluation
+                    best_move = move
+
+                alpha = max(alpha, evaluation)
+                if beta <= alpha:
+                    self.record_cutoff(move, index, ply, depth)
+                    break
+
+            self.store_result(key, depth, max_eval, best_move, alpha_orig, beta_orig)
+            return max_eval, best_move
+        else:
+            min_eval = float('inf')
+            for index, move in enumerate(legal_moves):
+                quiet = not in_check and not self.board.is_capture(move) and not move.promotion
+                self.board.push_move(move)
+                evaluation = self.search_child(depth, alpha, beta, False, ply, index, quiet)
+                self.board.pop_move()
+
+                if evaluation < min_eval:
+                    min_eval = evaluation
+                    best_move = move
+
+                beta = min(beta, evaluation)
+                if beta <= alpha:
+                    self.record_cutoff(move, index, ply, depth)
+                    break
+
+            self.store_result(key, depth, min_eval, best_move, alpha_orig, beta_orig)
+            return min_eval, best_move
+
+    def null_move_cutoff(self, depth, alpha, beta, maximizing_player, ply):
+        # Pass the move: if a reduced search still can't get back inside the
+        # window, a real move won't either. Skipped in pawn endings (zugzwang)
+        if not self.null_move or ply == 0 or depth < NULL_MOVE_MIN_DEPTH:
+            return False
+        bound = beta if maximizing_player else alpha
+        if abs(bound) == float('inf'):
+            return False
+        board = self.board.board
+        if not board.occupied_co[board.turn] & ~(board.pawns | board.kings):
+            return False
+
+        window = (beta - NULL_WINDOW, beta) if maximizing_player else (alpha, alpha + NULL_WINDOW)
+        self.board.push_move(chess.Move.null())
+        evaluation, _ = self.minimax(
+            depth - 1 - NULL_MOVE_REDUCTION, *window, not maximizing_player, ply + 1, allow_null=False)
+        self.board.pop_move()
+        return evaluation >= beta if maximizing_player else evaluation <= alpha
+
+    def search_child(self, depth, alpha, beta, maximizing_player, ply, index, quiet):
+        # Searches the move just pushed. Moves after the first get a zero window
+        # (and a reduced depth when late and quiet) and are only searched again
+        # in full if they might improve on the current bound
+        child = not maximizing_player
+        bound = alpha if maximizing_player else beta
+        if index == 0 or abs(bound) == float('inf') or not (self.pvs or self.lmr):
+            return self.minimax(depth - 1, alpha, beta, child, ply + 1)[0]
+
+        window = (alpha, alpha + NULL_WINDOW) if maximizing_player else (beta - NULL_WINDOW, beta)
+
+        if (self.lmr and quiet and index >= LMR_MIN_MOVES and depth >= LMR_MIN_DEPTH
+                and not self.board.is_check()):
+            evaluation = self.minimax(depth - 2, *window, child, ply + 1)[0]
+            if (evaluation <= alpha) if maximizing_player else (evaluation >= beta):
+                return evaluation
+
+        if self.pvs:
+            evaluation = self.minimax(depth - 1, *window, child, ply + 1)[0]
+            # Outside the window either can't improve or is already a cutoff
+            if not alpha < evaluation < beta:
+                return evaluation
+
+        return self.minimax(depth - 1, alpha, beta, child, ply + 1)[0]
+
+    def record_cutoff(self, move, index, ply, depth):
+        self.orderer.record_cutoff(self.board, move, ply, depth)
+        self.stats.record_cutoff(ply, index)
+
+    def principal_variation(self, depth):
+        pv = []
+        seen = set()
+        while len(pv) < depth:
+            key = self.board.get_hash()
+            entry = self.tt.peek(key)
+            if entry is None or entry[3] is None or key in seen:
+                break
+            move = entry[3]
+            if not self.board.is_legal(move):
+                break
+            seen.add(key)
+            pv.append(move)
+            self.board.push_move(move)
+
+        for _ in pv:
+            self.board.pop_move()
+        return pv
+
+    def check_time(self):
+        if self.nodes < self.next_time_check:
+            return
+        self.next_time_check = self.nodes + 256
+        if not self.interruptible:
+            return
+        if self.stop_requested or (self.stop_event is not None and self.stop_event.is_set()):
+            raise SearchTimeout()
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            raise SearchTimeout()
+
+    def store_result(self, key, depth, value, best_move, alpha, beta):
+        if value <= alpha:
+            flag = UPPER
+        elif value >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.tt.store(key, depth, flag, value, best_move)
+
+    def make_best_move(self, time_limit_ms=None):
+        if time_limit_ms is None:
+            time_limit_ms = self.time_limit_ms
+        max_depth = self.max_depth or MAX_SEARCH_DEPTH
+
+        self.nodes = 0
+        self.next_time_check = 0
+        self.completed_depth = 0
+        self.stats.reset(self.board.board.fen())
+
+        bitbase_move = self.bitbase_move()
+        if bitbase_move:
+            self.past_moves.append(bitbase_move)
+            return bitbase_move
+
+        self.tt.new_search()
+        self.orderer.new_search()
+
+        start = time.perf_counter()
+        deadline = None if time_limit_ms is None else start + time_limit_ms / 1000
+        root_ply = self.board.get_ply()
+        best_move = None
+        scores = []
+
+        # Each iteration leaves its best moves in the TT and history tables,
+        # which the next, deeper iteration searches first
+        for depth in range(1, max_depth + 1):
+            # Depth 1 always completes, whatever the clock or a stop request
+            # says, so there is a searched move to fall back on
+            self.deadline = deadline if depth > 1 else None
+            self.interruptible = depth > 1
+            # A stop that came in during depth 1 is seen on the next node
+            self.next_time_check = self.nodes
+            depth_start = time.perf_counter()
+            try:
+                score, move = self.aspiration_search(depth, scores)
+            except SearchTimeout:
+                while self.board.get_ply() > root_ply:
+                    self.board.pop_move()
+                break
+            finally:
+                self.deadline = None
+                self.interruptible = True
+
+            if move:
+                best_move = move
+            scores.append(score)
+            self.completed_depth = depth
+            self.stats.record_depth(
+                depth, time.perf_counter() - depth_start, self.nodes, score, move,
+                self.principal_variation(depth))
+
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+
+        self.stats.nodes = self.nodes
+        self.stats.seconds = time.perf_counter() - start
+        self.stats.eval_cache = self.eval_cache.stats()
+        if self.stats_log:
+            self.stats.append_json_line(self.stats_log)
+
+        if best_move:
+            self.past_moves.append(best_move)
+            return best_move
+        else:
+            return random.choice(self.board.get_legal_moves())
+
+    def profile_best_move(self, limit=25, path=None):
+        return profile_call(self.make_best_move, limit=limit, path=path)
+
+    def make_move(self):
+        # Book hits skip the search entirely
+        if self.book:
+            book_move = self.book.probe(self.board)
+            if book_move:
+                return book_move
+
+        return self.make_best_move()
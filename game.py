@@ -1,39 +1,134 @@
 import chess.pgn
 import chess
 from board import ChessBoard
+from archive import GameArchive
+# The AI lives in the GUI-free engine module; re-exported for existing imports
+from engine import AI, SearchTimeout, random_move, MAX_SEARCH_DEPTH, AI_TIME_LIMIT_MS
+import queue
 import random
-import tkinter.simpledialog as simpledialog
-import tkinter as tk
-import tkinter.messagebox as messagebox
+import threading
+import time
+import traceback
 
 BOARD_SIZE = 540
 SQUARE_SIZE = BOARD_SIZE // 8
 
+SEARCH_POLL_MS = 20
+
+# Pondering stops on its own after this long, even if the player never moves
+PONDER_TIME_LIMIT_MS = 4 * AI_TIME_LIMIT_MS
+
+STATUS_HELP = "1 = Player vs AI, 2 = AI vs AI, S = search stats"
+
+
+class BackgroundSearch:
+    def __init__(self, root):
+        self.root = root
+        self.results = queue.Queue()
+        self.thread = None
+        self.searcher = None
+        self.generation = 0
+
+    def is_running(self):
+        return self.thread is not None
+
+    def start(self, searcher, callback):
+        self.cancel()
+        self.searcher = searcher
+
+        if self.root is None:
+            move = self.searcher.make_move()
+            self.searcher = None
+            callback(move, searcher)
+            return
+
+        self.thread = threading.Thread(target=self.run, args=(self.searcher,), daemon=True)
+        self.thread.start()
+        self.root.after(SEARCH_POLL_MS, self.poll, self.generation, callback)
+
+    def run(self, searcher):
+        # A failed search still posts a result, so poll always ends
+        try:
+            self.results.put((searcher.make_move(), None))
+        except Exception as error:
+            self.results.put((None, error))
+
+    def poll(self, generation, callback):
+        # A cancelled search's poll loop just stops
+        if generation != self.generation:
+            return
+
+        try:
+            move, error = self.results.get_nowait()
+        except queue.Empty:
+            self.root.after(SEARCH_POLL_MS, self.poll, generation, callback)
+            return
+
+        searcher = self.searcher
+        self.thread = None
+        self.searcher = None
+        if error is not None:
+            print("AI search failed:")
+            traceback.print_exception(error)
+        callback(move, searcher)
+
+    def stop(self, generation=None):
+        # Ends the search early but still delivers its move to the callback
+        if self.thread is not None and generation in (None, self.generation):
+            self.searcher.stop()
+
+    def cancel(self):
+        self.generation += 1
+        if self.thread is None:
+            return
+        self.searcher.stop()
+        self.thread.join()
+        self.thread = None
+        self.searcher = None
+        # Drop the move the cancelled search may have produced
+        while not self.results.empty():
+            self.results.get_nowait()
+
 
 class ChessGame:
     def __init__(self, canvas, images, root):
         self.player_color = random.choice([chess.WHITE, chess.BLACK])
         self.board = ChessBoard(canvas, images, self.player_color)
         self.root = root
-        self.pgn_game = chess.pgn.Game()
-        self.current_node = self.pgn_game.add_variation(chess.Move.null())
-        self.pgn_moves = []
+        self.archive = GameArchive()
+        self.start_pgn()
         self.ai_vs_ai = False
         self.images = images
 
         self.ai_color = chess.BLACK if self.player_color == chess.WHITE else chess.WHITE
-        self.ai = AI(self.ai_color, self.board)
+        self.ai = AI(self.ai_color, self.board, max_depth=None, time_limit_ms=AI_TIME_LIMIT_MS)
+        self.search = BackgroundSearch(root)
+        self.ponder_enabled = True
+        self.ponder_move = None
+        self.ponder_result = None
+        self.ponder_hit = False
+        self.ponder_started = 0
+        self.show_stats = False
+        self.status_label = None
 
         self.decide_first_turn()
 
         if canvas:
+            import tkinter as tk
             self.status_label = tk.Label(
-                root, text="1 = Player vs AI, 2 = AI vs AI", font=("Arial", 12), anchor="w")
+                root, text=STATUS_HELP, font=("Arial", 12), anchor="w")
             self.status_label.pack(side="bottom", fill="x")
 
             self.board.draw_board()
             self.bind_keys()
             canvas.bind("<Button-1>", self.handle_click)
+            root.protocol("WM_DELETE_WINDOW", self.close)
+
+    def close(self):
+        # Stops any search or ponder thread before the window goes away
+        self.cancel_search()
+        self.ai.close()
+        self.root.destroy()
 
     def print_board(self):
         print(self.board.board)
@@ -42,76 +137,111 @@ class ChessGame:
         self.images = new_images
         self.board.images = new_images
         self.board.draw_board()
-        self.root.update()
 
     def bind_keys(self):
         self.root.bind("1", self.set_player_vs_ai)
         self.root.bind("2", self.set_ai_vs_ai)
+        self.root.bind("s", self.toggle_stats)
+
+    def toggle_stats(self, event=None):
+        self.show_stats = not self.show_stats
+        self.update_status()
+
+    def update_status(self):
+        if self.status_label is None:
+            return
+        if self.show_stats and self.ai.stats.depth:
+            self.status_label.config(text=self.ai.stats.summary())
+        else:
+            self.status_label.config(text=STATUS_HELP)
 
     def set_player_vs_ai(self, event=None):
+        self.cancel_search()
         self.ai_vs_ai = False
         self.player_color = random.choice([chess.WHITE, chess.BLACK])
+        self.set_ai_color(not self.player_color)
         self.decide_first_turn()
 
     def set_ai_vs_ai(self, event=None):
+        self.cancel_search()
         self.ai_vs_ai = True
         self.run_ai_vs_ai()
 
+    def set_ai_color(self, color):
+        self.ai_color = color
+        if self.ai.color != color:
+            # Stored scores are from the old color's point of view
+            self.ai.color = color
+            self.ai.tt.clear()
+
     def decide_first_turn(self):
-        if self.player_color == chess.BLACK:
-            move = self.ai.make_move()
-            if move:
-                self.board.push_move(move)
-                self.log_move(move, "AI")
-            self.board.draw_board()
-            self.root.update()
+        if self.board.get_turn() == self.ai_color:
+            self.ai_turn()
 
     def make_random_opponent_move(self):
         if self.check_game_over():
             return None
 
-        legal_moves = self.board.get_legal_moves()
-        if legal_moves:
-            random_move = random.choice(legal_moves)
-            if self.board.is_pawn_promotion(random_move):
-                random_move = chess.Move(
-                    random_move.from_square, random_move.to_square, promotion=chess.QUEEN)
-            self.board.push_move(random_move)
-            self.log_move(random_move, "Opponent")
-            return random_move
-        return None
+        move = random_move(self.board)
+        if move:
+            self.board.push_move(move)
+            self.log_move(move, "Opponent")
+        return move
 
     def log_move(self, move, player):
         move_str = move.uci()
         self.current_node = self.current_node.add_variation(move)
         self.pgn_moves.append(move_str)
 
+    def start_pgn(self):
+        self.pgn_game = chess.pgn.Game()
+        self.pgn_game.headers["Date"] = time.strftime("%Y.%m.%d")
+        self.current_node = self.pgn_game
+        self.pgn_moves = []
+
+    def archive_game(self):
+        # Appends the finished game to the on-disk archive and starts a new record
+        if self.pgn_moves:
+            headers = self.pgn_game.headers
+            opponent = "Random" if self.ai_vs_ai else "Player"
+            headers["Event"] = "AI vs AI" if self.ai_vs_ai else "Player vs AI"
+            headers["White"] = "AI" if self.ai_color == chess.WHITE else opponent
+            headers["Black"] = "AI" if self.ai_color == chess.BLACK else opponent
+            headers["Result"] = self.board.board.result()
+            self.archive.append(self.pgn_game)
+        self.start_pgn()
+
     def check_game_over(self):
         if self.board.is_game_over():
             print('Game ended')
+            self.archive_game()
+            self.cancel_search()
 
             if self.ai_vs_ai:
                 print("AI vs AI game over. Restarting in 4 seconds...")
+                self.ai_vs_ai = False
+                self.board.reset_board()
                 self.root.after(400, self.reset_game)
             else:
+                # Answering yes runs reset_game, which also starts the AI's
+                # search when it plays white, so nothing may reset after it
                 self.show_player_vs_ai_end_dialog()
-
-            self.board.reset_board()
-            self.ai_vs_ai = False
             return True
         return False
 
     def show_player_vs_ai_end_dialog(self):
-        if self.board.is_checkmate():
+        status = self.board.status()
+        if status == chess.Termination.CHECKMATE:
             if self.board.get_turn() == self.player_color:
                 message = "Game Over: You lost. Do you want to retry?"
             else:
                 message = "You won! Do you want to retry?"
-        elif self.board.is_stalemate():
+        elif status is not None:
             message = "The game is a draw. Do you want to retry?"
         else:
             return
 
+        import tkinter.messagebox as messagebox
         result = messagebox.askquestion("Game Over", message, icon='warning')
 
         if result == 'yes':
@@ -120,14 +250,16 @@ class ChessGame:
             self.root.quit()
 
     def reset_game(self):
+        self.cancel_search()
         self.board.reset_board()
-        self.pgn_game = chess.pgn.Game()
-        self.current_node = self.pgn_game.add_variation(chess.Move.null())
+        self.start_pgn()
         self.decide_first_turn()
         self.board.draw_board()
-        self.root.update()
 
     def run_ai_vs_ai(self):
+        if not self.ai_vs_ai or self.search.is_running():
+            return
+
         if self.check_game_over():
             print("Game over detected")
             return
@@ -135,18 +267,23 @@ class ChessGame:
         current_turn = self.board.get_turn()
 
         if current_turn == self.ai_color:
-            move = self.ai.make_move()
-            if move and move in self.board.get_legal_moves():
-                self.board.push_move(move)
-                self.log_move(move, "AI")
-            else:
-                print(f"Invalid move by AI: {move}")
-        else:
-            move = self.make_random_opponent_move()
+            self.search.start(self.fork_ai(), self.finish_ai_vs_ai_move)
+            return
 
+        self.make_random_opponent_move()
         self.board.draw_board()
-        self.root.update()
+        self.root.after(400, self.run_ai_vs_ai)
 
+    def finish_ai_vs_ai_move(self, move, searcher):
+        self.ai.stats = searcher.stats
+        if self.board.is_legal(move):
+            self.board.push_move(move)
+            self.log_move(move, "AI")
+        else:
+            print(f"Invalid move by AI: {move}")
+
+        self.update_status()
+        self.board.draw_board()
         self.root.after(400, self.run_ai_vs_ai)
 
     def handle_click(self, event):
@@ -174,12 +311,12 @@ class ChessGame:
             piece = self.board.get_piece_at(square)
             if piece and piece.color == self.board.get_turn():
                 self.board.selected_piece = square
-                self.board.possible_moves = {
-                    move.to_square for move in self.board.get_legal_moves() if move.from_square == square}
+                self.board.possible_moves = {move.to_square for move in self.board.get_moves_from(square)}
         else:
             if square in self.board.possible_moves:
                 promotion_piece = None
                 if self.board.get_piece_at(self.board.selected_piece).piece_type == chess.PAWN and chess.square_rank(square) in [0, 7]:
+                    import tkinter.simpledialog as simpledialog
                     promotion_choice = simpledialog.askstring(
                         "Promotion", "Promote to (q, r, b, n):", parent=self.root)
                     if promotion_choice:
@@ -194,10 +331,9 @@ class ChessGame:
                 else:
                     move = chess.Move(self.board.selected_piece, square)
 
-                if move in self.board.get_legal_moves():
+                if self.board.is_legal(move):
                     self.board.make_move(move)
                     self.log_move(move, "Player")
-                    self.check_game_over()
 
                     if not self.check_game_over() and self.board.get_turn() == self.ai_color:
                         self.root.after(200, self.ai_turn)
@@ -210,6 +346,16 @@ class ChessGame:
 
         self.board.draw_board()
 
+    def cancel_search(self):
+        self.search.cancel()
+        self.ponder_move = None
+        self.ponder_result = None
+        self.ponder_hit = False
+
+    def fork_ai(self):
+        # Search a snapshot so the UI can keep drawing the real board meanwhile
+        return self.ai.fork(self.board.copy())
+
     def ai_turn(self):
         if self.check_game_over():
             return
@@ -217,153 +363,77 @@ class ChessGame:
         if self.board.get_turn() != self.ai_color:
             return
 
-        ai_move = self.ai.make_move()
-        if ai_move:
-            self.board.push_move(ai_move)
-            self.log_move(ai_move, "AI")
-            self.check_game_over()
-        
-        self.board.draw_board()
-        self.root.update()
-
-class AI:
-    def __init__(self, color, board, max_depth=2):
-        self.board = board
-        self.color = color
-        self.max_depth = max_depth
-        self.successful_moves = []
-        self.past_moves = []
-        self.load_successful_moves()
-
-    def evaluate_board(self):
-        piece_values = {
-            chess.PAWN: 1,
-            chess.KNIGHT: 3,
-            chess.BISHOP: 3,
-            chess.ROOK: 5,
-            chess.QUEEN: 9,
-            chess.KING: 0
-        }
-
-        center_squares = [chess.E4, chess.D4, chess.E5, chess.D5]
-        development_bonus = 0.1
-        king_safety_bonus = 0.5
-        score = 0
-
-        # Develop pieces from starting positions
-        starting_squares = {
-            chess.KNIGHT: [chess.B1, chess.G1] if self.color == chess.WHITE else [chess.B8, chess.G8],
-            chess.BISHOP: [chess.C1, chess.F1] if self.color == chess.WHITE else [chess.C8, chess.F8],
-            chess.ROOK: [chess.A1, chess.H1] if self.color == chess.WHITE else [
-                chess.A8, chess.H8]
-        }
-
-        # Check for checkmate or stalemate
-        if self.board.is_checkmate():
-            if self.board.get_turn() == self.color:
-                return -float('inf')  # AI is losing
-            else:
-                return float('inf')   # AI is winning
-
-        if self.board.is_stalemate():
-            return -50
-
-        for square in chess.SQUARES:
-            piece = self.board.get_piece_at(square)
-            if piece:
-                value = piece_values[piece.piece_type]
-                if piece.color == self.color:
-                    score += value
-                else:
-                    score -= value
-
-                # center control
-                if square in center_squares:
-                    score += 0.5 if piece.color == self.color else -0.5
-
-                # developing
-                if piece.piece_type in [chess.KNIGHT, chess.BISHOP, chess.ROOK]:
-                    if square not in starting_squares.get(piece.piece_type, []):
-                        score += development_bonus
-
-                # usseless moves
-                if piece.piece_type in [chess.KING, chess.ROOK] and square in starting_squares.get(piece.piece_type, []):
-                    score -= 0.2
-
-        # Kings safety
-        king_square = self.board.find_king(self.color)
-        if king_square in [chess.G1, chess.G8, chess.C1, chess.C8]:  # Castling
-            score += king_safety_bonus
-
-        return score
-
-    def minimax(self, depth, alpha, beta, maximizing_player):
-        if depth == 0 or self.board.is_game_over():
-            return self.evaluate_board(), None
+        if self.resolve_ponder() or self.search.is_running():
+            return
 
-        legal_moves = list(self.board.get_legal_moves())
-        best_move = None
+        self.search.start(self.fork_ai(), self.finish_ai_turn)
 
-        if maximizing_player:
-            max_eval = -float('inf')
-            for move in legal_moves:
-                self.board.push_move(move)
+    def finish_ai_turn(self, ai_move, searcher):
+        # Each fork keeps its own stats, so S shows the search behind the move just played
+        self.ai.stats = searcher.stats
+        if self.board.is_legal(ai_move):
+            self.board.push_move(ai_move)
+            self.log_move(ai_move, "AI")
+            if not self.check_game_over():
+                self.start_pondering()
 
-                evaluation, _ = self.minimax(depth - 1, alpha, beta, False)
-                self.board.pop_move()
+        self.update_status()
+        self.board.draw_board()
 
-                if evaluation > max_eval:
-                    max_eval = evaluation
-                    best_move = move
+    def start_pondering(self):
+        # Without a Tk root searches run inline, so pondering would only block
+        if (not self.ponder_enabled or self.root is None or self.ai_vs_ai
+                or self.board.get_turn() != self.player_color):
+            return
 
-                alpha = max(alpha, evaluation)
-                if beta <= alpha:
-                    break
+        # The TT move of the current position is the reply the AI expects
+        entry = self.ai.tt.peek(self.board.get_hash())
+        predicted_move = entry[3] if entry else None
+        if not self.board.is_legal(predicted_move):
+            return
 
-            return max_eval, best_move
-        else:
-            min_eval = float('inf')
-            for move in legal_moves:
-                self.board.push_move(move)
-                evaluation, _ = self.minimax(depth - 1, alpha, beta, True)
-                self.board.pop_move()
-
-                if evaluation < min_eval:
-                    min_eval = evaluation
-                    best_move = move
-
-                beta = min(beta, evaluation)
-                if beta <= alpha:
-                    break
-
-            return min_eval, best_move
-
-    def make_best_move(self):
-        _, best_move = self.minimax(
-            self.max_depth, -float('inf'), float('inf'), True)
-        if best_move:
-            self.past_moves.append(best_move)
-            return best_move
+        snapshot = self.board.copy()
+        snapshot.push_move(predicted_move)
+        searcher = self.ai.fork(snapshot)
+        searcher.max_depth = MAX_SEARCH_DEPTH
+        searcher.time_limit_ms = PONDER_TIME_LIMIT_MS
+
+        self.ponder_move = predicted_move
+        self.ponder_result = None
+        self.ponder_hit = False
+        self.ponder_started = time.perf_counter()
+        self.search.start(searcher, self.finish_pondering)
+
+    def finish_pondering(self, move, searcher):
+        if move is None and not self.ponder_hit:
+            # A failed ponder search leaves the reply to a normal search
+            self.ponder_move = None
+        elif self.ponder_hit:
+            self.ponder_hit = False
+            self.finish_ai_turn(move, searcher)
         else:
-            return random.choice(list(self.board.get_legal_moves()))
-
-    def load_successful_moves(self):
-        self.successful_moves = [
-            (chess.D2, chess.D4),
-            (chess.D7, chess.D5)
-        ]
-
-    def translate_move(self, move):
-        if self.color == chess.BLACK:
-            return chess.Move(chess.square_mirror(move.from_square), chess.square_mirror(move.to_square))
-        return move
-
-    def make_move(self):
-        legal_moves = list(self.board.get_legal_moves())
-
-        for move in self.successful_moves:
-            translated_move = self.translate_move(chess.Move(move[0], move[1]))
-            if translated_move in legal_moves:
-                return translated_move
+            self.ponder_result = (move, searcher)
+
+    def resolve_ponder(self):
+        ponder_move, self.ponder_move = self.ponder_move, None
+        if ponder_move is None:
+            return False
+
+        if self.board.get_last_move() != ponder_move:
+            # The player went another way: drop the pondered line. Its TT
+            # entries are keyed by position, so they stay valid
+            self.search.cancel()
+            self.ponder_result = None
+            return False
+
+        if self.ponder_result is not None:
+            (move, searcher), self.ponder_result = self.ponder_result, None
+            self.finish_ai_turn(move, searcher)
+            return True
 
-        return self.make_best_move()
+        # Let the ponder search run until it has used a normal move's budget
+        self.ponder_hit = True
+        elapsed_ms = (time.perf_counter() - self.ponder_started) * 1000
+        remaining_ms = max(0, int((self.ai.time_limit_ms or 0) - elapsed_ms))
+        self.root.after(remaining_ms, self.search.stop, self.search.generation)
+        return True
@@ -0,0 +1,439 @@
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import chess
+
+import parallel
+
+# Line protocol, one command per line:
+#   new [white|black] [movetime MS] [fen FEN]  -> game ID, then the engine's move if it starts
+#   move ID UCI                                -> move ID UCI with the engine's reply
+#   go ID                                      -> asks the engine to move again after "busy"
+#   fen ID / close ID / stats / quit
+# Finished games are announced with "over ID RESULT"; "busy ID" means the
+# search queue is full and the move was not played, so it can be resent.
+HOST = "127.0.0.1"
+PORT = 8765
+
+DEFAULT_MOVETIME_MS = 100
+# Upper bound on a client's movetime, so one game can't hold a worker for long
+MAX_MOVETIME_MS = 10000
+MAX_SESSIONS = 10000
+
+# Latencies kept for the percentiles
+LATENCY_WINDOW = 10000
+
+# How long the load client waits before resending a refused move
+BUSY_RETRY_SECONDS = 0.05
+
+def think(fen, moves, movetime_ms, depth):
+    board = parallel.worker_board
+    board.set_position(fen, moves)
+    ai = parallel.worker_ais[board.get_turn()]
+    ai.max_depth = depth
+    ai.time_limit_ms = movetime_ms
+    ai.stats.reset()
+    start = time.perf_counter()
+    move = ai.make_move()
+    return move.uci(), ai.stats.nodes, (time.perf_counter() - start) * 1000
+
+
+def is_number(token):
+    # isdigit alone also accepts characters such as superscripts that int() rejects
+    return token.isascii() and token.isdigit()
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class HostMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.moves = 0
+        self.nodes = 0
+        self.rejected = 0
+        # Latency runs from the request to the reply, so it includes queueing
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.search_times = deque(maxlen=LATENCY_WINDOW)
+
+    def record(self, latency_ms, search_ms, nodes):
+        self.moves += 1
+        self.nodes += nodes
+        self.latencies.append(latency_ms)
+        self.search_times.append(search_ms)
+
+    def to_dict(self):
+        elapsed = time.perf_counter() - self.started
+        return {
+            'moves': self.moves,
+            'moves_per_sec': self.moves / elapsed if elapsed else 0.0,
+            'nodes_per_sec': self.nodes / elapsed if elapsed else 0.0,
+            'rejected': self.rejected,
+            'p50_ms': percentile(self.latencies, 0.50),
+            'p99_ms': percentile(self.latencies, 0.99),
+            'search_p50_ms': percentile(self.search_times, 0.50),
+        }
+
+
+class GameSession:
+    def __init__(self, game_id, engine_color, movetime_ms, fen, send):
+        # Only the position is kept here; searching happens in the worker pool
+        self.id = game_id
+        self.engine_color = engine_color
+        self.movetime_ms = movetime_ms
+        self.start_fen = fen
+        self.board = chess.Board(fen)
+        self.send = send
+        self.thinking = False
+        self.closed = False
+
+    def history(self):
+        return [move.uci() for move in self.board.move_stack]
+
+
+class GameHost:
+    def __init__(self, workers, max_queue, max_sessions=MAX_SESSIONS, movetime_ms=DEFAULT_MOVETIME_MS,
+                 depth=None, hash_size_mb=16):
+        from engine import MAX_SEARCH_DEPTH
+
+        self.workers = workers
+        self.max_sessions = max_sessions
+        self.movetime_ms = movetime_ms
+        self.depth = depth or MAX_SEARCH_DEPTH
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers, initializer=parallel.init_worker,
+            initargs=(hash_size_mb, None, {'max_depth': None}))
+        # Bounded, so a flood of moves is turned away instead of piling up latency
+        self.queue = asyncio.Queue(max_queue)
+        self.sessions = {}
+        self.game_ids = itertools.count(1)
+        self.metrics = HostMetrics()
+        self.dispatchers = []
+
+    def start(self):
+        # Forks the workers before the server accepts anyone
+        self.executor.submit(time.sleep, 0).result()
+        self.dispatchers = [asyncio.create_task(self.dispatch()) for _ in range(self.workers)]
+
+    def close(self):
+        for task in self.dispatchers:
+            task.cancel()
+        self.executor.shutdown(cancel_futures=True)
+
+    def stats(self):
+        stats = self.metrics.to_dict()
+        stats['sessions'] = len(self.sessions)
+        stats['queued'] = self.queue.qsize()
+        return stats
+
+    def request_move(self, session):
+        try:
+            self.queue.put_nowait((session, time.perf_counter()))
+        except asyncio.QueueFull:
+            self.metrics.rejected += 1
+            return False
+        session.thinking = True
+        return True
+
+    async def dispatch(self):
+        # One dispatcher per worker keeps exactly as many searches in flight as there are processes
+        loop = asyncio.get_running_loop()
+        while True:
+            session, requested = await self.queue.get()
+            if session.closed:
+                continue
+            try:
+                move, nodes, search_ms = await loop.run_in_executor(
+                    self.executor, think, session.start_fen, session.history(),
+                    session.movetime_ms, self.depth)
+            except Exception as error:
+                session.thinking = False
+                session.send(f"error {session.id} search failed: {error!r}")
+                continue
+            self.metrics.record((time.perf_counter() - requested) * 1000, search_ms, nodes)
+            session.thinking = False
+            if session.closed:
+                continue
+            session.board.push_uci(move)
+            session.send(f"move {session.id} {move}")
+            self.report_if_over(session)
+
+    def report_if_over(self, session):
+        outcome = session.board.outcome()
+        if outcome is None:
+            return False
+        session.send(f"over {session.id} {outcome.result()}")
+        self.close_session(session)
+        return True
+
+    def close_session(self, session):
+        session.closed = True
+        self.sessions.pop(session.id, None)
+
+    def new_game(self, args, send, owned):
+        if len(self.sessions) >= self.max_sessions:
+            return "error too many games"
+        player_color = chess.WHITE
+        movetime_ms = self.movetime_ms
+        fen = chess.STARTING_FEN
+        i = 0
+        while i < len(args):
+            if args[i] in ("white", "black"):
+                player_color = args[i] == "white"
+            elif args[i] == "movetime" and i + 1 < len(args) and is_number(args[i + 1]):
+                movetime_ms = max(1, min(int(args[i + 1]), MAX_MOVETIME_MS))
+                i += 1
+            elif args[i] == "fen":
+                fen = " ".join(args[i + 1:])
+                break
+            i += 1
+        try:
+            chess.Board(fen)
+        except ValueError:
+            return "error bad fen"
+
+        session = GameSession(next(self.game_ids), not player_color, movetime_ms, fen, send)
+        self.sessions[session.id] = session
+        owned.add(session.id)
+        send(f"game {session.id}")
+        if not self.report_if_over(session) and session.board.turn == session.engine_color:
+            if not self.request_move(session):
+                send(f"busy {session.id}")
+        return None
+
+    def play_move(self, session, uci):
+        if session.thinking or session.board.turn == session.engine_color:
+            return f"error {session.id} not your turn"
+        try:
+            move = chess.Move.from_uci(uci)
+        except ValueError:
+            return f"error {session.id} illegal move"
+        if move not in session.board.legal_moves:
+            return f"error {session.id} illegal move"
+        # Checked before the move is played, so a rejected move can simply be resent
+        if self.queue.full():
+            self.metrics.rejected += 1
+            return f"busy {session.id}"
+
+        session.board.push(move)
+        if not self.report_if_over(session):
+            self.request_move(session)
+        return None
+
+    def handle(self, line, send, owned):
+        tokens = line.split()
+        if not tokens:
+            return None
+        command, args = tokens[0], tokens[1:]
+
+        if command == "new":
+            return self.new_game(args, send, owned)
+        if command == "stats":
+            return "stats " + " ".join(f"{key}={value:.1f}" if isinstance(value, float) else f"{key}={value}"
+                                       for key, value in self.stats().items())
+        if command not in ("move", "go", "fen", "close"):
+            return f"error unknown command {command}"
+
+        session = self.sessions.get(int(args[0])) if args and is_number(args[0]) else None
+        if session is None or session.id not in owned:
+            return "error no such game"
+        if command == "move":
+            return self.play_move(session, args[1] if len(args) > 1 else "")
+        if command == "go":
+            if session.thinking or session.board.turn != session.engine_color:
+                return f"error {session.id} not the engine's turn"
+            return None if self.request_move(session) else f"busy {session.id}"
+        if command == "fen":
+            return f"fen {session.id} {session.board.fen()}"
+        self.close_session(session)
+        return f"closed {session.id}"
+
+    async def serve_client(self, reader, writer):
+        owned = set()
+
+        def send(line):
+            if not writer.is_closing():
+                writer.write((line + "\n").encode())
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line or line.strip() == b"quit":
+                    break
+                # A stray non-UTF-8 byte just makes the command unknown
+                reply = self.handle(line.decode(errors="replace"), send, owned)
+                if reply:
+                    send(reply)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            for game_id in owned:
+                session = self.sessions.get(game_id)
+                if session:
+                    self.close_session(session)
+            writer.close()
+
+
+async def report(host, interval):
+    while True:
+        await asyncio.sleep(interval)
+        stats = host.stats()
+        print(f"{stats['sessions']} games, {stats['queued']} queued, {stats['moves_per_sec']:.1f} moves/sec, "
+              f"p50 {stats['p50_ms']:.0f} ms, p99 {stats['p99_ms']:.0f} ms, {stats['rejected']} rejected")
+
+
+async def serve(address, port, workers, max_queue, max_sessions, movetime_ms, depth, hash_size_mb,
+                report_every):
+    host = GameHost(workers, max_queue, max_sessions, movetime_ms, depth, hash_size_mb)
+    host.start()
+    reporter = None
+    try:
+        server = await asyncio.start_server(host.serve_client, address, port)
+        print(f"Serving on {address}:{port} with {workers} workers")
+        if report_every:
+            reporter = asyncio.create_task(report(host, report_every))
+        async with server:
+            await server.serve_forever()
+    finally:
+        if reporter:
+            reporter.cancel()
+        host.close()
+
+
+class LoadConnection:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        # Replies to "new" arrive in order; everything else is routed by game id
+        self.pending_games = deque()
+        self.games = {}
+
+    async def read_replies(self):
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                return
+            tokens = line.decode().split()
+            if tokens[0] == "game":
+                game_id = int(tokens[1])
+                self.games[game_id] = asyncio.Queue()
+                self.pending_games.popleft().set_result(game_id)
+            elif len(tokens) > 1 and is_number(tokens[1]) and int(tokens[1]) in self.games:
+                await self.games[int(tokens[1])].put(tokens)
+
+    def send(self, line):
+        self.writer.write((line + "\n").encode())
+
+    async def new_game(self):
+        future = asyncio.get_running_loop().create_future()
+        self.pending_games.append(future)
+        self.send("new white")
+        return await future
+
+
+async def play_load_game(connection, max_plies, latencies, counters):
+    # Plays random moves against the host and times each engine reply
+    game_id = await connection.new_game()
+    replies = connection.games[game_id]
+    board = chess.Board()
+    while board.ply() < max_plies:
+        move = random.choice(list(board.legal_moves))
+        start = time.perf_counter()
+        connection.send(f"move {game_id} {move.uci()}")
+        tokens = await replies.get()
+        if tokens[0] == "busy":
+            counters['busy'] += 1
+            await asyncio.sleep(BUSY_RETRY_SECONDS * random.uniform(0.5, 1.5))
+            continue
+        if tokens[0] == "error":
+            # The host gave up on this move, for example after a failed search
+            counters['errors'] += 1
+            connection.send(f"close {game_id}")
+            break
+        board.push(move)
+        if tokens[0] == "over":
+            break
+        board.push_uci(tokens[2])
+        latencies.append((time.perf_counter() - start) * 1000)
+        if board.is_game_over():
+            await replies.get()
+            break
+    else:
+        connection.send(f"close {game_id}")
+    counters['games'] += 1
+
+
+async def run_load(address, port, games, connections, max_plies, seed):
+    random.seed(seed)
+    streams = [await asyncio.open_connection(address, port) for _ in range(connections)]
+    pool = [LoadConnection(reader, writer) for reader, writer in streams]
+    readers = [asyncio.create_task(connection.read_replies()) for connection in pool]
+
+    latencies = []
+    counters = {'games': 0, 'busy': 0, 'errors': 0}
+    start = time.perf_counter()
+    await asyncio.gather(*(play_load_game(pool[i % connections], max_plies, latencies, counters)
+                           for i in range(games)))
+    elapsed = time.perf_counter() - start
+
+    # The stats reply is read directly, so the routing readers have to stop first
+    for task in readers:
+        task.cancel()
+    await asyncio.gather(*readers, return_exceptions=True)
+    pool[0].send("stats")
+    server_stats = None
+    while server_stats is None:
+        line = (await pool[0].reader.readline()).decode()
+        if line.startswith("stats"):
+            server_stats = line.split(maxsplit=1)[1].strip()
+    for connection in pool:
+        connection.writer.close()
+
+    print(f"{counters['games']} games, {len(latencies)} engine moves in {elapsed:.1f}s "
+          f"({len(latencies) / elapsed:.1f} moves/sec), {counters['busy']} busy replies, "
+          f"{counters['errors']} errors")
+    print(f"client latency p50 {percentile(latencies, 0.50):.0f} ms, p99 {percentile(latencies, 0.99):.0f} ms")
+    print(f"host: {server_stats}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Host many concurrent games over a line protocol, "
+                                                 "sharing one pool of AI workers")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--max-queue", type=int, default=None,
+                        help="searches waiting for a worker before moves are refused, 8 per worker by default")
+    parser.add_argument("--max-games", type=int, default=MAX_SESSIONS)
+    parser.add_argument("--movetime", type=int, default=DEFAULT_MOVETIME_MS, help="default per-move budget in milliseconds")
+    parser.add_argument("--depth", type=int, default=None, help="maximum search depth")
+    parser.add_argument("--hash", type=int, default=16, help="transposition table size per worker in MB")
+    parser.add_argument("--report-every", type=float, default=10.0, help="seconds between metric lines, 0 to disable")
+    parser.add_argument("--load", type=int, metavar="GAMES",
+                        help="instead of serving, play GAMES random-move games against a running host")
+    parser.add_argument("--connections", type=int, default=10)
+    parser.add_argument("--max-plies", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.load:
+        asyncio.run(run_load(args.host, args.port, args.load, args.connections, args.max_plies, args.seed))
+    else:
+        workers = args.workers or os.cpu_count()
+        max_queue = args.max_queue or 8 * workers
+        try:
+            asyncio.run(serve(args.host, args.port, workers, max_queue, args.max_games, args.movetime,
+                              args.depth, args.hash, args.report_every))
+        except KeyboardInterrupt:
+            pass
@@ -1,17 +1,14 @@
 import tkinter as tk
-from PIL import Image, ImageTk
 import chess
 from game import ChessGame, AI
+from sprites import SPRITES
 import time
+import multiprocessing
 
 BOARD_SIZE = 540
 SQUARE_SIZE = BOARD_SIZE // 8
 
 
-def load_image(filename, size):
-    return ImageTk.PhotoImage(Image.open(filename).resize(size))
-
-
 class ChessApp:
     def __init__(self, root=None):
         self.root = root
@@ -24,6 +21,7 @@ class ChessApp:
             self.canvas.pack()
 
         self.images = self.load_images()
+        SPRITES.prewarm()
         self.game = ChessGame(self.canvas, self.images, self.root)
         self.setup_ui()
 
@@ -33,21 +31,7 @@ class ChessApp:
         self.canvas.bind("<Button-1>", self.game.handle_click)
 
     def load_images(self):
-        size = (self.square_size, self.square_size)
-        return {
-            'r': load_image('images/rB.png', size),
-            'n': load_image('images/nB.png', size),
-            'b': load_image('images/bB.png', size),
-            'q': load_image('images/qB.png', size),
-            'k': load_image('images/kB.png', size),
-            'p': load_image('images/pB.png', size),
-            'R': load_image('images/rW.png', size),
-            'N': load_image('images/nW.png', size),
-            'B': load_image('images/bW.png', size),
-            'Q': load_image('images/qW.png', size),
-            'K': load_image('images/kW.png', size),
-            'P': load_image('images/pW.png', size),
-        }
+        return SPRITES.images(self.square_size)
 
     def change_resolution(self, new_size):
         self.board_size = new_size
@@ -86,6 +70,7 @@ class ChessApp:
 
 
 if __name__ == "__main__":
+        multiprocessing.freeze_support()
         root = tk.Tk()
         ChessApp(root)
         root.mainloop()
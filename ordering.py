@@ -0,0 +1,63 @@
+import chess
+from board import PIECE_VALUES
+
+MAX_PLY = 64
+
+HASH_MOVE_SCORE = 1 << 30
+CAPTURE_SCORE = 1 << 28
+KILLER_SCORES = (1 << 27, (1 << 27) - 1)
+
+
+class MoveOrderer:
+    def __init__(self):
+        self.killers = [[None, None] for _ in range(MAX_PLY)]
+        self.history = [[0] * 64 for _ in range(64)]
+
+    def new_search(self):
+        self.killers = [[None, None] for _ in range(MAX_PLY)]
+        # Age the history scores so older searches don't dominate
+        for row in self.history:
+            for to_square in range(64):
+                row[to_square] >>= 1
+
+    def score_move(self, board, move, ply, hash_move):
+        if move == hash_move:
+            return HASH_MOVE_SCORE
+
+        capture = board.is_capture(move)
+        if capture or move.promotion:
+            # MVV-LVA: most valuable victim first, cheapest attacker breaks ties
+            victim_value = 0
+            if capture:
+                victim = board.get_piece_at(move.to_square)
+                # En passant leaves the target square empty
+                victim_value = PIECE_VALUES[victim.piece_type if victim else chess.PAWN]
+            if move.promotion:
+                victim_value += PIECE_VALUES[move.promotion]
+            attacker_value = PIECE_VALUES[board.get_piece_at(move.from_square).piece_type]
+            return CAPTURE_SCORE + victim_value * 16 - attacker_value
+
+        if ply < MAX_PLY:
+            killers = self.killers[ply]
+            if move == killers[0]:
+                return KILLER_SCORES[0]
+            if move == killers[1]:
+                return KILLER_SCORES[1]
+
+        return self.history[move.from_square][move.to_square]
+
+    def order_moves(self, board, moves, ply=0, hash_move=None):
+        return sorted(
+            moves, key=lambda move: self.score_move(board, move, ply, hash_move), reverse=True)
+
+    def record_cutoff(self, board, move, ply, depth):
+        if board.is_capture(move) or move.promotion:
+            return
+
+        if ply < MAX_PLY:
+            killers = self.killers[ply]
+            if move != killers[0]:
+                killers[1] = killers[0]
+                killers[0] = move
+
+        self.history[move.from_square][move.to_square] += depth * depth
@@ -0,0 +1,182 @@
+import argparse
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import chess
+
+# How often the parent checks for a stop while the workers search
+STOP_POLL_SECONDS = 0.02
+
+worker_board = None
+worker_ais = {}
+worker_search_ids = {}
+
+
+def init_worker(hash_size_mb, stop_event=None, ai_options=None):
+    # Pool initializer for the parallel search, the analysis tool and the game
+    # host: each worker process keeps one board and one AI per side across tasks
+    global worker_board
+    from board import ChessBoard
+    from engine import AI
+
+    worker_board = ChessBoard(None, {}, chess.WHITE)
+    for color in chess.COLORS:
+        worker_ais[color] = AI(color, worker_board, hash_size_mb=hash_size_mb, **(ai_options or {}))
+        worker_ais[color].stop_event = stop_event
+
+
+def search_move(fen, history, color, depth, move, best_eval, alpha, beta, options, time_left_ms,
+                search_id=None):
+    from engine import SearchTimeout
+
+    ai = worker_ais[color]
+    # A new root search ages the worker's tables the same way make_best_move does
+    if worker_search_ids.get(color) != search_id:
+        worker_search_ids[color] = search_id
+        ai.tt.new_search()
+        ai.orderer.new_search()
+    for name, value in options.items():
+        setattr(ai, name, value)
+    worker_board.set_position(fen, history)
+    ai.nodes = 0
+    ai.next_time_check = 0
+    ai.deadline = None if time_left_ms is None else time.perf_counter() + time_left_ms / 1000
+    try:
+        evaluation = ai.search_root_move(chess.Move.from_uci(move), depth, best_eval, alpha, beta)
+    except SearchTimeout:
+        return None, ai.nodes
+    finally:
+        ai.deadline = None
+    return evaluation, ai.nodes
+
+
+class ParallelSearch:
+    # With plain alpha-beta this plays the same move with the same score as the
+    # serial search at equal depth. Null-move pruning, LMR and PVS make scores
+    # depend on the search window and the TT contents, and the workers search
+    # against the first move's bound in their own tables, so with those on the
+    # two can pick different moves
+    def __init__(self, workers, hash_size_mb=16):
+        self.workers = workers
+        self.stop_event = multiprocessing.Event()
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers, initializer=init_worker, initargs=(hash_size_mb, self.stop_event))
+
+    def search_root(self, ai, moves, depth, alpha=-float('inf'), beta=float('inf')):
+        from engine import SearchTimeout
+
+        # The first move is searched locally to get a bound for the others,
+        # then the remaining root moves are split across the workers
+        best_move = moves[0]
+        best_eval = ai.search_root_move(best_move, depth, -float('inf'), alpha, beta)
+        if len(moves) == 1 or best_eval >= beta:
+            return best_eval, best_move
+
+        time_left_ms = None
+        if ai.deadline is not None:
+            time_left_ms = max(0, (ai.deadline - time.perf_counter()) * 1000)
+
+        fen, history = ai.board.get_position()
+        options = ai.search_options()
+        # The main table's generation identifies the root search to the workers
+        search_id = ai.tt.generation
+        self.stop_event.clear()
+        futures = [
+            self.executor.submit(
+                search_move, fen, history, ai.color, depth, move.uci(), best_eval, alpha, beta,
+                options, time_left_ms, search_id)
+            for move in moves[1:]
+        ]
+
+        # Polled rather than blocking on each result, so a stop request reaches
+        # the workers even when they have no deadline of their own
+        pending = set(futures)
+        timed_out = False
+        while pending:
+            done, pending = wait(pending, timeout=STOP_POLL_SECONDS, return_when=FIRST_COMPLETED)
+            stopped = ai.stop_requested and ai.interruptible
+            if not timed_out and (stopped or any(future.result()[0] is None for future in done)):
+                timed_out = True
+                self.stop_event.set()
+                for future in pending:
+                    future.cancel()
+
+        results = []
+        for future in futures:
+            if future.cancelled():
+                continue
+            evaluation, nodes = future.result()
+            ai.nodes += nodes
+            results.append(evaluation)
+
+        if timed_out:
+            raise SearchTimeout()
+
+        for move, evaluation in zip(moves[1:], results):
+            if ai.is_better_root_move(move, evaluation, best_move, best_eval):
+                best_eval, best_move = evaluation, move
+
+        return best_eval, best_move
+
+    def start(self):
+        # Forks the workers now rather than on the first search
+        self.executor.submit(time.sleep, 0).result()
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+
+
+BENCHMARK_FENS = [
+    "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3",
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+    "r2q1rk1/pP1p2pp/Q4n2/bbp1p3/Np6/1B3NBn/pPPP1PPP/R3K2R b KQ - 0 1",
+    "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+]
+
+
+def measure_speedup(fens, depth, worker_counts, selective=True):
+    from board import ChessBoard
+    from engine import AI
+
+    rows = []
+    for workers in worker_counts:
+        total_time = 0.0
+        nodes = 0
+        moves = []
+        for fen in fens:
+            board = ChessBoard(None, {}, chess.WHITE)
+            board.set_position(fen)
+            ai = AI(board.get_turn(), board, max_depth=depth, workers=workers)
+            ai.pvs = ai.null_move = ai.lmr = ai.aspiration = selective
+            if workers > 1:
+                # Start the pool outside the timed region
+                ai.parallel = ParallelSearch(workers, ai.hash_size_mb)
+                ai.parallel.start()
+
+            start = time.perf_counter()
+            moves.append(ai.make_best_move().uci())
+            total_time += time.perf_counter() - start
+            nodes += ai.nodes
+            ai.close()
+        rows.append({'workers': workers, 'seconds': total_time, 'nodes': nodes, 'moves': moves})
+
+    serial = rows[0]
+    for row in rows:
+        row['speedup'] = serial['seconds'] / row['seconds']
+        row['same_moves'] = row['moves'] == serial['moves']
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure parallel search speedup against core count")
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--plain", action="store_true",
+                        help="switch off PVS, null-move, LMR and aspiration, so the moves must match")
+    args = parser.parse_args()
+
+    worker_counts = sorted(set([1] + args.workers))
+    for row in measure_speedup(BENCHMARK_FENS, args.depth, worker_counts, selective=not args.plain):
+        print(f"workers={row['workers']:2d}  time={row['seconds']:7.2f}s  nodes={row['nodes']:8d}  "
+              f"speedup={row['speedup']:4.2f}x  same_moves={row['same_moves']}")
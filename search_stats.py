@@ -0,0 +1,80 @@
+import json
+
+
+class SearchStats:
+    def __init__(self):
+        self.reset()
+
+    def reset(self, fen=None):
+        self.fen = fen
+        self.nodes = 0
+        self.leaf_evals = 0
+        self.cutoffs = []
+        self.first_move_cutoffs = 0
+        self.depth_times = []
+        self.depth = 0
+        self.score = None
+        self.best_move = None
+        self.pv = []
+        self.seconds = 0.0
+        self.eval_cache = {}
+
+    def record_cutoff(self, ply, move_index):
+        while len(self.cutoffs) <= ply:
+            self.cutoffs.append(0)
+        self.cutoffs[ply] += 1
+        if move_index == 0:
+            self.first_move_cutoffs += 1
+
+    def record_depth(self, depth, seconds, nodes, score, best_move, pv):
+        self.depth_times.append({'depth': depth, 'seconds': seconds, 'nodes': nodes})
+        self.depth = depth
+        self.score = score
+        self.best_move = best_move
+        self.pv = pv
+
+    def first_move_cutoff_rate(self):
+        total = sum(self.cutoffs)
+        return self.first_move_cutoffs / total if total else 0.0
+
+    def nodes_per_second(self):
+        return self.nodes / self.seconds if self.seconds else 0.0
+
+    def to_dict(self):
+        return {
+            'fen': self.fen,
+            'move': self.best_move.uci() if self.best_move else None,
+            'score': self.score,
+            'depth': self.depth,
+            'nodes': self.nodes,
+            'leaf_evals': self.leaf_evals,
+            'seconds': self.seconds,
+            'nps': self.nodes_per_second(),
+            'cutoffs_per_ply': self.cutoffs,
+            'first_move_cutoff_rate': self.first_move_cutoff_rate(),
+            'depth_times': self.depth_times,
+            'pv': [move.uci() for move in self.pv],
+            'eval_cache': self.eval_cache,
+        }
+
+    def summary(self):
+        pv = " ".join(move.uci() for move in self.pv[:6])
+        eval_hits = self.eval_cache.get('hit_rate', 0.0)
+        return (f"depth {self.depth} | {self.nodes} nodes | {self.nodes_per_second():.0f} nps | "
+                f"first-move cutoffs {self.first_move_cutoff_rate():.0%} | eval cache {eval_hits:.0%} | pv {pv}")
+
+    def append_json_line(self, path):
+        with open(path, "a") as f:
+            f.write(json.dumps(self.to_dict()) + "\n")
+
+
+def profile_call(function, *args, sort='cumulative', limit=25, path=None):
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    result = profiler.runcall(function, *args)
+    if path:
+        profiler.dump_stats(path)
+    pstats.Stats(profiler).sort_stats(sort).print_stats(limit)
+    return result
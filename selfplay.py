@@ -0,0 +1,93 @@
+import argparse
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import chess
+import chess.pgn
+
+from archive import GameArchive
+from board import ChessBoard
+from engine import AI, random_move
+
+PLAYER_NAMES = {'ai': "AI", 'random': "Random"}
+
+
+def play_game(game_id, white, black, depth, movetime, max_plies, seed):
+    random.seed(seed)
+    board = ChessBoard(None, {}, chess.WHITE)
+    players = {}
+    for color, kind in ((chess.WHITE, white), (chess.BLACK, black)):
+        if kind == 'ai':
+            players[color] = AI(color, board, max_depth=depth, time_limit_ms=movetime)
+
+    start = time.perf_counter()
+    while not board.is_game_over() and board.get_ply() < max_plies:
+        ai = players.get(board.get_turn())
+        move = ai.make_move() if ai else random_move(board)
+        board.push_move(move)
+    elapsed = time.perf_counter() - start
+
+    result = board.board.result() if board.is_game_over() else "*"
+    game = chess.pgn.Game.from_board(board.board)
+    game.headers["Event"] = "Self-play"
+    game.headers["Round"] = str(game_id)
+    game.headers["White"] = PLAYER_NAMES[white]
+    game.headers["Black"] = PLAYER_NAMES[black]
+    game.headers["Result"] = result
+    game.headers["PlyCount"] = str(board.get_ply())
+    return game_id, result, board.get_ply(), elapsed, game
+
+
+def run_tournament(games, workers, white, black, depth, movetime, max_plies, output, seed):
+    results = {"1-0": 0, "0-1": 0, "1/2-1/2": 0, "*": 0}
+    plies = 0
+    start = time.perf_counter()
+
+    archive = GameArchive(output)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(play_game, game_id, white, black, depth, movetime, max_plies, seed + game_id)
+            for game_id in range(1, games + 1)
+        ]
+        # Games are written as they finish, so an interrupted run keeps its results
+        for done, future in enumerate(as_completed(futures), 1):
+            game_id, result, game_plies, _, game = future.result()
+            archive.append(game)
+
+            results[result] += 1
+            plies += game_plies
+            elapsed = time.perf_counter() - start
+            print(f"[{done}/{games}] game {game_id}: {result} in {game_plies} plies  "
+                  f"({done / elapsed:.2f} games/sec)")
+
+    elapsed = time.perf_counter() - start
+    return {
+        'games': games,
+        'seconds': elapsed,
+        'games_per_sec': games / elapsed,
+        'plies_per_sec': plies / elapsed,
+        'results': results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play headless AI self-play games across a process pool")
+    parser.add_argument("--games", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--white", choices=PLAYER_NAMES, default='ai')
+    parser.add_argument("--black", choices=PLAYER_NAMES, default='random')
+    parser.add_argument("--depth", type=int, default=2)
+    parser.add_argument("--movetime", type=int, default=None, help="per-move budget in milliseconds")
+    parser.add_argument("--max-plies", type=int, default=300)
+    parser.add_argument("--output", default="selfplay.pgn")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    summary = run_tournament(args.games, args.workers, args.white, args.black, args.depth,
+                             args.movetime, args.max_plies, args.output, args.seed)
+    results = summary['results']
+    print(f"{summary['games']} games in {summary['seconds']:.1f}s "
+          f"({summary['games_per_sec']:.2f} games/sec, {summary['plies_per_sec']:.1f} plies/sec)")
+    print(f"White wins {results['1-0']}, black wins {results['0-1']}, "
+          f"draws {results['1/2-1/2']}, unfinished {results['*']}")
@@ -0,0 +1,90 @@
+import threading
+from collections import OrderedDict
+from PIL import Image, ImageTk
+
+PIECE_FILES = {
+    'r': 'images/rB.png',
+    'n': 'images/nB.png',
+    'b': 'images/bB.png',
+    'q': 'images/QB.png',
+    'k': 'images/kB.png',
+    'p': 'images/pB.png',
+    'R': 'images/rW.png',
+    'N': 'images/nW.png',
+    'B': 'images/bW.png',
+    'Q': 'images/QW.png',
+    'K': 'images/kW.png',
+    'P': 'images/pW.png',
+}
+
+# Square sizes for boards of 400 to 800 pixels
+COMMON_SQUARE_SIZES = [50, 60, 67, 75, 80, 90, 100]
+
+
+class SpriteStore:
+    def __init__(self, max_sizes=8):
+        self.max_entries = max_sizes * len(PIECE_FILES)
+        self.lock = threading.Lock()
+        self.sources = {}
+        self.resized = OrderedDict()
+        self.photos = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def source(self, symbol):
+        with self.lock:
+            image = self.sources.get(symbol)
+            if image is None:
+                image = Image.open(PIECE_FILES[symbol])
+                image.load()
+                self.sources[symbol] = image
+            return image
+
+    def resize(self, symbol, size):
+        key = (symbol, size)
+        with self.lock:
+            image = self.resized.get(key)
+            if image is not None:
+                self.resized.move_to_end(key)
+                return image
+
+        image = self.source(symbol).resize((size, size))
+        with self.lock:
+            self.resized[key] = image
+            while len(self.resized) > self.max_entries:
+                self.resized.popitem(last=False)
+        return image
+
+    def get(self, symbol, size):
+        # PhotoImages belong to Tk and must be created on the UI thread
+        key = (symbol, size)
+        photo = self.photos.get(key)
+        if photo is not None:
+            self.photos.move_to_end(key)
+            self.hits += 1
+            return photo
+
+        self.misses += 1
+        photo = ImageTk.PhotoImage(self.resize(symbol, size))
+        self.photos[key] = photo
+        while len(self.photos) > self.max_entries:
+            self.photos.popitem(last=False)
+        return photo
+
+    def images(self, size):
+        return {symbol: self.get(symbol, size) for symbol in PIECE_FILES}
+
+    def prewarm(self, sizes=COMMON_SQUARE_SIZES):
+        # Decoding and resampling happen off the UI thread; only the cheap
+        # PhotoImage wrap is left for when a size is actually used
+        def run():
+            for size in sizes:
+                for symbol in PIECE_FILES:
+                    self.resize(symbol, size)
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+
+
+SPRITES = SpriteStore()
@@ -0,0 +1,108 @@
+import random
+
+import chess
+import pytest
+
+from board import ChessBoard
+from engine import AI
+
+
+def baseline_eval(position, color):
+    # evaluate_board from before the evaluation became incremental, with its
+    # literal tables and float arithmetic, on a plain chess.Board
+    piece_values = {
+        chess.PAWN: 1,
+        chess.KNIGHT: 3,
+        chess.BISHOP: 3,
+        chess.ROOK: 5,
+        chess.QUEEN: 9,
+        chess.KING: 0
+    }
+
+    center_squares = [chess.E4, chess.D4, chess.E5, chess.D5]
+    development_bonus = 0.1
+    king_safety_bonus = 0.5
+    score = 0
+
+    starting_squares = {
+        chess.KNIGHT: [chess.B1, chess.G1] if color == chess.WHITE else [chess.B8, chess.G8],
+        chess.BISHOP: [chess.C1, chess.F1] if color == chess.WHITE else [chess.C8, chess.F8],
+        chess.ROOK: [chess.A1, chess.H1] if color == chess.WHITE else [chess.A8, chess.H8]
+    }
+
+    if position.is_checkmate():
+        return -float('inf') if position.turn == color else float('inf')
+
+    if position.is_stalemate():
+        return -50
+
+    for square in chess.SQUARES:
+        piece = position.piece_at(square)
+        if piece:
+            value = piece_values[piece.piece_type]
+            if piece.color == color:
+                score += value
+            else:
+                score -= value
+
+            if square in center_squares:
+                score += 0.5 if piece.color == color else -0.5
+
+            if piece.piece_type in [chess.KNIGHT, chess.BISHOP, chess.ROOK]:
+                if square not in starting_squares.get(piece.piece_type, []):
+                    score += development_bonus
+
+            if piece.piece_type in [chess.KING, chess.ROOK] and square in starting_squares.get(piece.piece_type, []):
+                score -= 0.2
+
+    if position.king(color) in [chess.G1, chess.G8, chess.C1, chess.C8]:
+        score += king_safety_bonus
+
+    return score
+
+
+def assert_matches_baseline(board):
+    # Mates and stalemates are scored in AI.score_position, covered below
+    if board.board.is_checkmate() or board.board.is_stalemate():
+        return
+    for color in chess.COLORS:
+        assert board.get_eval(color) == pytest.approx(baseline_eval(board.board, color), abs=1e-9)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_incremental_eval_matches_baseline(seed):
+    rng = random.Random(seed)
+    board = ChessBoard(None, {}, chess.WHITE)
+    assert_matches_baseline(board)
+
+    for _ in range(300):
+        moves = board.get_legal_moves()
+        # Pops are mixed in so restored entries are checked as well as pushed ones
+        if not moves or (board.get_ply() and rng.random() < 0.3):
+            board.pop_move()
+        else:
+            board.push_move(rng.choice(moves))
+        assert_matches_baseline(board)
+
+
+def test_eval_after_set_position():
+    board = ChessBoard(None, {}, chess.WHITE)
+    board.set_position("r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+                       ["c4c5", "e8g8", "d1e1", "b2a1q"])
+    assert_matches_baseline(board)
+
+
+@pytest.mark.parametrize("fen, moves", [
+    # Fool's mate, white is mated
+    (chess.STARTING_FEN, ["f2f3", "e7e5", "g2g4", "d8h4"]),
+    # Stalemate, also insufficient material
+    ("k7/8/K7/4B3/8/8/8/8 b - - 0 1", []),
+    # Stalemate with material left
+    ("7k/5Q2/6K1/8/8/8/8/8 b - - 0 1", []),
+])
+def test_terminal_scores_match_baseline(fen, moves):
+    board = ChessBoard(None, {}, chess.WHITE)
+    board.set_position(fen, moves)
+    for color in chess.COLORS:
+        ai = AI(color, board, book_path=None)
+        assert ai.score_position() == baseline_eval(board.board, color)
@@ -0,0 +1,159 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import chess
+
+import host
+from host import GameHost
+
+
+class Client:
+    def __init__(self):
+        self.lines = []
+        self.owned = set()
+
+    def send(self, line):
+        self.lines.append(line)
+
+
+def make_host(max_queue):
+    # No start(): nothing is forked and queued searches stay queued until a test dispatches them
+    return GameHost(workers=1, max_queue=max_queue, movetime_ms=10, depth=1)
+
+
+def test_new_game():
+    async def run():
+        game_host = make_host(max_queue=4)
+        client = Client()
+        assert game_host.handle("new white", client.send, client.owned) is None
+        assert game_host.handle("new black movetime 50", client.send, client.owned) is None
+        game_host.close()
+        return game_host, client
+
+    game_host, client = asyncio.run(run())
+    assert client.lines == ["game 1", "game 2"]
+    assert client.owned == {1, 2}
+    assert not game_host.sessions[1].thinking
+    # The engine plays white in game 2, so its search is queued straight away
+    assert game_host.sessions[2].thinking
+    assert game_host.sessions[2].movetime_ms == 50
+    assert game_host.queue.qsize() == 1
+
+
+def test_movetime_is_capped():
+    async def run():
+        game_host = make_host(max_queue=4)
+        client = Client()
+        game_host.handle(f"new white movetime {10 * host.MAX_MOVETIME_MS}", client.send, client.owned)
+        game_host.close()
+        return game_host
+
+    game_host = asyncio.run(run())
+    assert game_host.sessions[1].movetime_ms == host.MAX_MOVETIME_MS
+
+
+def test_move_refused_while_queue_is_full():
+    async def run():
+        game_host = make_host(max_queue=1)
+        client = Client()
+        game_host.handle("new black", client.send, client.owned)
+        game_host.handle("new white", client.send, client.owned)
+        session = game_host.sessions[2]
+
+        assert game_host.handle("move 2 e2e4", client.send, client.owned) == "busy 2"
+        # Refused before it is played, so the same move can be resent
+        assert session.board.ply() == 0
+        assert not session.thinking
+        assert game_host.metrics.rejected == 1
+
+        game_host.queue.get_nowait()
+        assert game_host.handle("move 2 e2e4", client.send, client.owned) is None
+        assert session.board.move_stack == [chess.Move.from_uci("e2e4")]
+        assert session.thinking
+        assert game_host.queue.get_nowait()[0] is session
+        game_host.close()
+
+    asyncio.run(run())
+
+
+def test_close_while_search_is_queued(monkeypatch):
+    searched = []
+
+    def fake_think(fen, moves, movetime_ms, depth):
+        searched.append(moves)
+        board = chess.Board(fen)
+        for move in moves:
+            board.push_uci(move)
+        return next(iter(board.legal_moves)).uci(), 1, 0.0
+
+    monkeypatch.setattr(host, "think", fake_think)
+
+    async def run():
+        game_host = make_host(max_queue=4)
+        game_host.executor.shutdown()
+        game_host.executor = ThreadPoolExecutor(max_workers=1)
+        client = Client()
+        game_host.handle("new white", client.send, client.owned)
+        game_host.handle("new white", client.send, client.owned)
+        game_host.handle("move 1 e2e4", client.send, client.owned)
+        game_host.handle("move 2 d2d4", client.send, client.owned)
+        assert game_host.handle("close 1", client.send, client.owned) == "closed 1"
+        assert 1 not in game_host.sessions
+
+        dispatcher = asyncio.create_task(game_host.dispatch())
+        while not any(line.startswith("move 2 ") for line in client.lines):
+            await asyncio.sleep(0.01)
+        dispatcher.cancel()
+        game_host.close()
+        return game_host, client
+
+    game_host, client = asyncio.run(run())
+    # Game 1's queued search was skipped rather than sent to a worker
+    assert searched == [["d2d4"]]
+    assert not any(line.startswith("move 1 ") for line in client.lines)
+    assert game_host.metrics.moves == 1
+    assert game_host.handle("move 1 e7e5", client.send, client.owned) == "error no such game"
+
+
+def test_failed_search_reports_error(monkeypatch):
+    def failing_think(fen, moves, movetime_ms, depth):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(host, "think", failing_think)
+
+    async def run():
+        game_host = make_host(max_queue=4)
+        game_host.executor.shutdown()
+        game_host.executor = ThreadPoolExecutor(max_workers=1)
+        client = Client()
+        game_host.handle("new black", client.send, client.owned)
+        dispatcher = asyncio.create_task(game_host.dispatch())
+        while len(client.lines) < 2:
+            await asyncio.sleep(0.01)
+        dispatcher.cancel()
+        game_host.close()
+        return game_host, client
+
+    game_host, client = asyncio.run(run())
+    assert client.lines[1].startswith("error 1 search failed")
+    assert not game_host.sessions[1].thinking
+
+
+def test_bad_input_bytes_keep_the_connection():
+    async def run():
+        game_host = make_host(max_queue=4)
+        server = await asyncio.start_server(game_host.serve_client, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b"\xff\xfe\nmove \xc2\xb2 e2e4\nnew white\nquit\n")
+        replies = [(await reader.readline()).decode().strip() for _ in range(3)]
+        writer.close()
+        server.close()
+        await server.wait_closed()
+        game_host.close()
+        return replies
+
+    replies = asyncio.run(run())
+    assert replies[0].startswith("error unknown command")
+    assert replies[1] == "error no such game"
+    assert replies[2] == "game 1"
@@ -0,0 +1,41 @@
+import chess
+import pytest
+
+from board import ChessBoard
+from engine import AI
+
+POSITIONS = [
+    (chess.STARTING_FEN, ["e2e4", "e7e5"]),
+    ("r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/R1BQKB1R w KQkq - 2 3", []),
+    ("r2q1rk1/pP1p2pp/Q4n2/bbp1p3/Np6/1B3NBn/pPPP1PPP/R3K2R b KQ - 0 1", []),
+]
+
+
+def search(fen, moves, depth, aspiration, pruning):
+    board = ChessBoard(None, {}, chess.WHITE)
+    board.set_position(fen, moves)
+    ai = AI(board.get_turn(), board, max_depth=depth, book_path=None)
+    ai.pvs = ai.null_move = ai.lmr = pruning
+    ai.aspiration = aspiration
+    move = ai.make_best_move()
+    return move, ai.stats.score
+
+
+@pytest.mark.parametrize("pruning", [False, True])
+@pytest.mark.parametrize("fen, moves", POSITIONS)
+def test_aspiration_keeps_the_root_score(fen, moves, pruning):
+    # A fail high against the aspiration window used to leave false bounds
+    # in the TT, which the full-window re-search then trusted
+    assert search(fen, moves, 3, True, pruning) == search(fen, moves, 3, False, pruning)
+
+
+def test_stop_before_depth_one_still_searches():
+    board = ChessBoard(None, {}, chess.WHITE)
+    board.set_position(*POSITIONS[1])
+    expected = AI(board.get_turn(), board, max_depth=1, book_path=None).make_best_move()
+
+    ai = AI(board.get_turn(), board, max_depth=None, book_path=None)
+    ai.stop()
+    # The first iteration ignores the stop, later ones are cut short
+    assert ai.make_best_move() == expected
+    assert ai.completed_depth == 1
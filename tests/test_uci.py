@@ -0,0 +1,45 @@
+import io
+
+import chess
+
+from uci import UCIEngine
+
+
+def make_engine():
+    output = io.StringIO()
+    return UCIEngine(output=output), output
+
+
+def test_bad_option_values_are_ignored():
+    engine, output = make_engine()
+    assert engine.handle("setoption name Hash value abc")
+    assert engine.handle("setoption name Threads value 2x")
+    assert engine.hash_size_mb == 16
+    assert engine.threads == 1
+    assert "info string invalid value for hash: abc" in output.getvalue()
+    engine.handle("quit")
+
+
+def test_bad_go_numbers_are_skipped():
+    engine, output = make_engine()
+    engine.handle("position startpos")
+    engine.handle("go depth x movetime 50")
+    engine.stop_search()
+    assert output.getvalue().splitlines()[-1].startswith("bestmove ")
+    engine.handle("quit")
+
+
+def test_failed_search_still_sends_bestmove():
+    engine, output = make_engine()
+    searcher = engine.ais[chess.WHITE].fork(engine.board.copy())
+
+    def failing_make_move():
+        raise RuntimeError("worker died")
+
+    searcher.make_move = failing_make_move
+    engine.search(searcher, False)
+    lines = output.getvalue().splitlines()
+    assert lines[0] == "info string search failed: RuntimeError('worker died')"
+    move = chess.Move.from_uci(lines[1].split()[1])
+    assert move in engine.board.board.legal_moves
+    engine.handle("quit")
@@ -0,0 +1,176 @@
+import chess
+from array import array
+
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+# key + value + move + depth + flag + generation
+ENTRY_BYTES = 8 + 8 + 2 + 1 + 1 + 1
+
+
+def encode_move(move):
+    if not move:
+        return 0
+    return move.from_square | (move.to_square << 6) | ((move.promotion or 0) << 12)
+
+
+def decode_move(code):
+    if not code:
+        return None
+    return chess.Move(code & 63, (code >> 6) & 63, promotion=(code >> 12) or None)
+
+
+class TranspositionTable:
+    def __init__(self, size_mb=16):
+        self.resize(size_mb)
+
+    def resize(self, size_mb):
+        entries = 1
+        while entries * 2 * ENTRY_BYTES <= size_mb * 1024 * 1024:
+            entries *= 2
+        self.size = entries
+        self.mask = entries - 1
+        self.clear()
+
+    def clear(self):
+        self.keys = array('Q', [0]) * self.size
+        self.values = array('d', [0.0]) * self.size
+        self.moves = array('H', [0]) * self.size
+        self.depths = array('b', [-1]) * self.size
+        self.flags = array('B', [0]) * self.size
+        self.generations = array('B', [0]) * self.size
+        self.generation = 0
+        self.reset_counters()
+
+    def reset_counters(self):
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.overwrites = 0
+        self.cutoffs = 0
+
+    def new_search(self):
+        self.generation = (self.generation + 1) & 0xFF
+
+    def probe(self, key):
+        entry = self.peek(key)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def peek(self, key):
+        # Same lookup as probe, but left out of the hit/miss counters
+        index = key & self.mask
+        if self.depths[index] >= 0 and self.keys[index] == key:
+            return self.depths[index], self.flags[index], self.values[index], decode_move(self.moves[index])
+        return None
+
+    def store(self, key, depth, flag, value, move):
+        index = key & self.mask
+        stored_depth = self.depths[index]
+
+        # Depth-preferred replacement, but entries from older searches always give way
+        if (stored_depth >= 0 and self.keys[index] != key
+                and self.generations[index] == self.generation and depth < stored_depth):
+            return
+
+        if stored_depth >= 0 and self.keys[index] != key:
+            self.overwrites += 1
+
+        # Keep the old best move when the new result has none
+        if move is not None or self.keys[index] != key:
+            self.moves[index] = encode_move(move)
+
+        self.keys[index] = key
+        self.values[index] = value
+        self.depths[index] = min(depth, 127)
+        self.flags[index] = flag
+        self.generations[index] = self.generation
+        self.stores += 1
+
+    def hit_rate(self):
+        probes = self.hits + self.misses
+        return self.hits / probes if probes else 0.0
+
+    def memory_bytes(self):
+        return self.size * ENTRY_BYTES
+
+    def stats(self):
+        return {
+            'entries': self.size,
+            'memory_bytes': self.memory_bytes(),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hit_rate(),
+            'stores': self.stores,
+            'overwrites': self.overwrites,
+            'cutoffs': self.cutoffs,
+        }
+
+
+# key + value + used flag
+EVAL_ENTRY_BYTES = 8 + 8 + 1
+
+# Scores depend on which side is evaluating, so each perspective gets its own keys
+EVAL_COLOR_KEYS = {chess.WHITE: 0x9E3779B97F4A7C15, chess.BLACK: 0}
+
+
+class EvalCache:
+    def __init__(self, size_mb=4):
+        self.resize(size_mb)
+
+    def resize(self, size_mb):
+        entries = 1
+        while entries * 2 * EVAL_ENTRY_BYTES <= size_mb * 1024 * 1024:
+            entries *= 2
+        self.size = entries
+        self.mask = entries - 1
+        self.clear()
+
+    def clear(self):
+        self.keys = array('Q', [0]) * self.size
+        self.values = array('d', [0.0]) * self.size
+        self.used = array('B', [0]) * self.size
+        self.reset_counters()
+
+    def reset_counters(self):
+        self.hits = 0
+        self.misses = 0
+        self.overwrites = 0
+
+    def probe(self, key):
+        index = key & self.mask
+        if self.used[index] and self.keys[index] == key:
+            self.hits += 1
+            return self.values[index]
+        self.misses += 1
+        return None
+
+    def store(self, key, value):
+        # Direct-mapped: a new position always replaces whatever shared its slot
+        index = key & self.mask
+        if self.used[index] and self.keys[index] != key:
+            self.overwrites += 1
+        self.keys[index] = key
+        self.values[index] = value
+        self.used[index] = 1
+
+    def hit_rate(self):
+        probes = self.hits + self.misses
+        return self.hits / probes if probes else 0.0
+
+    def memory_bytes(self):
+        return self.size * EVAL_ENTRY_BYTES
+
+    def stats(self):
+        return {
+            'entries': self.size,
+            'memory_bytes': self.memory_bytes(),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hit_rate(),
+            'overwrites': self.overwrites,
+        }
@@ -0,0 +1,235 @@
+import sys
+import threading
+import time
+
+import chess
+
+from board import ChessBoard
+from engine import AI, MAX_SEARCH_DEPTH
+
+ENGINE_NAME = "chessApp"
+ENGINE_AUTHOR = "tinnit0"
+
+DEFAULT_HASH_MB = 16
+MAX_HASH_MB = 1024
+MAX_THREADS = 64
+
+# Without movestogo the clock is spread over this many moves
+DEFAULT_MOVES_TO_GO = 30
+MOVE_OVERHEAD_MS = 50
+
+
+def parse_int(token):
+    try:
+        return int(token)
+    except ValueError:
+        return None
+
+
+class UCIEngine:
+    def __init__(self, output=sys.stdout):
+        self.output = output
+        self.output_lock = threading.Lock()
+        self.board = ChessBoard(None, {}, chess.WHITE)
+        self.hash_size_mb = DEFAULT_HASH_MB
+        self.threads = 1
+        self.ais = {}
+        self.parallel = None
+        self.searcher = None
+        self.search_thread = None
+        self.stopped = threading.Event()
+        self.create_ais()
+
+    def send(self, line):
+        with self.output_lock:
+            self.output.write(line + "\n")
+            self.output.flush()
+
+    def create_ais(self):
+        # One AI per side, since stored scores are from the searching side's point of
+        # view. Both sides share one worker pool, and each worker also keeps a table
+        # per side, so Hash is split evenly over all of them
+        self.close_ais()
+        workers = self.threads if self.threads > 1 else 0
+        table_mb = self.hash_size_mb / (2 * (1 + workers))
+        if workers:
+            from parallel import ParallelSearch
+
+            # Started here so every forked searcher shares the same pool, and
+            # outside the search thread, since forking while the main thread
+            # blocks on stdin deadlocks the workers
+            self.parallel = ParallelSearch(workers, table_mb)
+            self.parallel.start()
+        for color in chess.COLORS:
+            ai = AI(color, self.board, max_depth=None, hash_size_mb=table_mb, workers=self.threads)
+            ai.parallel = self.parallel
+            self.ais[color] = ai
+
+    def close_ais(self):
+        for ai in self.ais.values():
+            ai.parallel = None
+            ai.close()
+        self.ais = {}
+        if self.parallel is not None:
+            self.parallel.close()
+            self.parallel = None
+
+    def handle(self, line):
+        tokens = line.split()
+        if not tokens:
+            return True
+        command, args = tokens[0], tokens[1:]
+
+        if command == "uci":
+            self.send(f"id name {ENGINE_NAME}")
+            self.send(f"id author {ENGINE_AUTHOR}")
+            self.send(f"option name Hash type spin default {DEFAULT_HASH_MB} min 1 max {MAX_HASH_MB}")
+            self.send(f"option name Threads type spin default 1 min 1 max {MAX_THREADS}")
+            self.send("uciok")
+        elif command == "isready":
+            self.send("readyok")
+        elif command == "setoption":
+            self.stop_search()
+            self.set_option(args)
+        elif command == "ucinewgame":
+            self.stop_search()
+            for ai in self.ais.values():
+                ai.tt.clear()
+                ai.eval_cache.clear()
+        elif command == "position":
+            self.stop_search()
+            self.set_position(args)
+        elif command == "go":
+            self.stop_search()
+            self.go(args)
+        elif command == "stop":
+            self.stop_search()
+        elif command == "quit":
+            self.stop_search()
+            self.close_ais()
+            return False
+        return True
+
+    def set_option(self, args):
+        if "name" not in args or "value" not in args:
+            return
+        name = " ".join(args[args.index("name") + 1:args.index("value")]).lower()
+        value = args[args.index("value") + 1] if args.index("value") + 1 < len(args) else ""
+        if name not in ("hash", "threads"):
+            return
+        number = parse_int(value)
+        if number is None:
+            # A bad value is ignored rather than taking the engine down
+            self.send(f"info string invalid value for {name}: {value}")
+            return
+        if name == "hash":
+            self.hash_size_mb = max(1, min(number, MAX_HASH_MB))
+            # Rebuilds the pool too, so the workers' tables follow the new size
+            self.create_ais()
+        elif name == "threads":
+            self.threads = max(1, min(number, MAX_THREADS))
+            self.create_ais()
+
+    def set_position(self, args):
+        if not args:
+            return
+        if args[0] == "startpos":
+            fen = chess.STARTING_FEN
+            rest = args[1:]
+        elif args[0] == "fen":
+            end = args.index("moves") if "moves" in args else len(args)
+            fen = " ".join(args[1:end])
+            rest = args[end:]
+        else:
+            return
+        moves = rest[1:] if rest and rest[0] == "moves" else []
+        self.board.set_position(fen, moves)
+
+    def go(self, args):
+        options = {}
+        infinite = False
+        i = 0
+        while i < len(args):
+            if args[i] == "infinite":
+                infinite = True
+            elif args[i] in ("movetime", "wtime", "btime", "winc", "binc", "movestogo", "depth"):
+                value = parse_int(args[i + 1]) if i + 1 < len(args) else None
+                if value is not None:
+                    options[args[i]] = value
+                i += 1
+            i += 1
+
+        searcher = self.ais[self.board.get_turn()].fork(self.board.copy())
+        searcher.max_depth = options.get("depth", MAX_SEARCH_DEPTH)
+        searcher.time_limit_ms = None if infinite else self.time_budget(options)
+        self.searcher = searcher
+        self.stopped.clear()
+        self.search_thread = threading.Thread(target=self.search, args=(searcher, infinite), daemon=True)
+        self.search_thread.start()
+
+    def time_budget(self, options):
+        if "movetime" in options:
+            return max(1, options["movetime"] - MOVE_OVERHEAD_MS)
+        white = self.board.get_turn() == chess.WHITE
+        time_left = options.get("wtime" if white else "btime")
+        if time_left is None:
+            return None
+        increment = options.get("winc" if white else "binc", 0)
+        moves_to_go = options.get("movestogo", DEFAULT_MOVES_TO_GO)
+        budget = time_left / max(1, moves_to_go) + increment * 3 / 4
+        return max(1, int(min(budget, time_left / 2) - MOVE_OVERHEAD_MS))
+
+    def search(self, searcher, infinite):
+        move = None
+        legal_moves = list(searcher.board.get_legal_moves())
+        try:
+            if legal_moves:
+                start = time.perf_counter()
+                move = searcher.make_move()
+                stats = searcher.stats
+                elapsed_ms = int((time.perf_counter() - start) * 1000)
+                if stats.depth:
+                    self.send(f"info depth {stats.depth} score {self.format_score(stats.score, stats.pv)} "
+                              f"nodes {stats.nodes} time {elapsed_ms} nps {int(stats.nodes_per_second())} "
+                              f"pv {' '.join(pv_move.uci() for pv_move in stats.pv)}")
+        except Exception as error:
+            # Falls back to the deepest finished iteration's move, or any legal one
+            self.send(f"info string search failed: {error!r}")
+            move = searcher.stats.best_move or legal_moves[0]
+        finally:
+            # The GUI waits for a bestmove whatever happens, and an infinite
+            # search only reports it once the GUI sends stop
+            if infinite:
+                self.stopped.wait()
+            self.send(f"bestmove {move.uci() if move else '0000'}")
+
+    def format_score(self, score, pv):
+        if score == float('inf'):
+            return f"mate {(len(pv) + 1) // 2}"
+        if score == -float('inf'):
+            return f"mate -{len(pv) // 2}"
+        return f"cp {round(score * 100)}"
+
+    def stop_search(self):
+        # stop interrupts the running search, which still reports its best move
+        if self.search_thread is not None:
+            self.searcher.stop()
+            self.stopped.set()
+            self.search_thread.join()
+            self.search_thread = None
+            self.searcher = None
+
+
+def main():
+    engine = UCIEngine()
+    for line in sys.stdin:
+        if not engine.handle(line):
+            break
+
+
+if __name__ == "__main__":
+    # Only needed for frozen builds, and multiprocessing itself costs ~30 ms to import
+    import multiprocessing
+
+    multiprocessing.freeze_support()
+    main()